@@ -0,0 +1,58 @@
+import numpy as np
+
+def get_squared_distances(centers_1, centers_2):
+    """Returns the (len(centers_1), len(centers_2)) matrix of squared distances between two arrays of (x, y) centers"""
+    deltas = centers_1[:, np.newaxis, :] - centers_2[np.newaxis, :, :]
+    return np.einsum("ijk,ijk->ij", deltas, deltas)
+
+def get_range_pairs(query_keys, sorted_keys):
+    """Returns the query indices and the positions in sorted_keys of all the (query, position) pairs with equal keys"""
+    starts = np.searchsorted(sorted_keys, query_keys, side="left")
+    counts = np.searchsorted(sorted_keys, query_keys, side="right") - starts
+    query_indices = np.repeat(np.arange(len(query_keys)), counts)
+    offsets = np.arange(len(query_indices)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return query_indices, np.repeat(starts, counts) + offsets
+
+def assign(candidate_detection_indices, candidate_track_indices, detection_centers, track_centers, distance_threshold):
+    """Greedy-by-distance assignment of detections to tracks among the candidate (detection, track) pairs.
+    Pairs closer than distance_threshold (a scalar or one value per detection) are gated in,
+    then assigned from the closest one, each detection and each track being used at most once.
+    Returns the detection indices, track indices and squared distances of the matched pairs, sorted by detection index"""
+    deltas = detection_centers[candidate_detection_indices] - track_centers[candidate_track_indices]
+    candidate_distances = np.einsum("ij,ij->i", deltas, deltas)
+    if np.ndim(distance_threshold):
+        distance_threshold = distance_threshold[candidate_detection_indices]
+    gated = candidate_distances < distance_threshold
+    candidate_detection_indices = candidate_detection_indices[gated]
+    candidate_track_indices = candidate_track_indices[gated]
+    candidate_distances = candidate_distances[gated]
+
+    # Closest pairs first, ties resolved by detection order, then by track order
+    order = np.lexsort((candidate_track_indices, candidate_detection_indices, candidate_distances))
+    matches = order[_assign_greedily(candidate_detection_indices[order], candidate_track_indices[order], len(detection_centers), len(track_centers))]
+    matches = matches[np.argsort(candidate_detection_indices[matches], kind="stable")]
+    return candidate_detection_indices[matches], candidate_track_indices[matches], candidate_distances[matches]
+
+def _assign_greedily(pair_detection_indices, pair_track_indices, detections_count, tracks_count):
+    """Returns the positions of the pairs picked by a greedy assignment that walks the pairs in the given order.
+    Every pair that comes first for both its detection and its track would be picked by the sequential walk,
+    so all of them are picked at once and the pairs in conflict with them are dropped, until no pair is left"""
+    assigned_detections = np.zeros(detections_count, dtype=bool)
+    assigned_tracks = np.zeros(tracks_count, dtype=bool)
+    positions = np.arange(len(pair_detection_indices))
+    picked_positions = []
+    while len(positions):
+        _, first_detection_positions = np.unique(pair_detection_indices, return_index=True)
+        _, first_track_positions = np.unique(pair_track_indices, return_index=True)
+        first_for_detection = np.zeros(len(positions), dtype=bool)
+        first_for_detection[first_detection_positions] = True
+        picked = first_track_positions[first_for_detection[first_track_positions]]
+        picked_positions.append(positions[picked])
+
+        assigned_detections[pair_detection_indices[picked]] = True
+        assigned_tracks[pair_track_indices[picked]] = True
+        remaining = ~assigned_detections[pair_detection_indices] & ~assigned_tracks[pair_track_indices]
+        positions = positions[remaining]
+        pair_detection_indices = pair_detection_indices[remaining]
+        pair_track_indices = pair_track_indices[remaining]
+    return np.concatenate(picked_positions) if picked_positions else positions
@@ -0,0 +1,104 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from object_tracker import ObjectTracker
+from pipeline import get_result_rows
+
+class AsyncObjectTracker:
+    """Asyncio facade around ObjectTracker. Tracking runs on a dedicated worker thread, so the event loop is never blocked.
+    Frames are read from the source into a buffer of at most max_pending_frames frames, and what happens when the
+    consumer falls behind depends on the policy:
+    "block": the source is not read until a pending frame is tracked, so every frame is tracked and yielded
+    "drop_stale": the oldest pending frame is dropped, the tracker only incrementing its frame index for it (the tracked
+    objects age, but their visibility and the hands are not updated)
+    "coalesce": the source is not read until the pending frames are tracked, all together, and only the state after the last one is yielded
+    The frame index of the tracker follows the frame indices of the source, frames missing from the source being handled as dropped frames"""
+    POLICIES = ("block", "drop_stale", "coalesce")
+
+    def __init__(self, image_width, image_height, policy="block", max_pending_frames=1, conf_threshold=0):
+        if policy not in AsyncObjectTracker.POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {AsyncObjectTracker.POLICIES}")
+        if max_pending_frames < 1:
+            raise ValueError("max_pending_frames must be at least 1")
+        self.object_tracker = ObjectTracker(image_width, image_height)
+        self.policy = policy
+        self.max_pending_frames = max_pending_frames
+        self.conf_threshold = conf_threshold
+        self.dropped_frames_count = 0
+        self.last_frame_index = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def track(self, frames):
+        """frames: async iterable of (frame_index, detections, tips_midpoints), detections being a (N, 6) array as in
+        ObjectTracker.register_seen_detections or a list of YoloObject.
+        Async generator of (frame_index, rows), the state of the tracker after frame_index as returned by pipeline.get_result_rows"""
+        loop = asyncio.get_running_loop()
+        pending_frames = deque()
+        condition = asyncio.Condition()
+        reading = [True]
+        reader = asyncio.create_task(self._read_frames(frames, pending_frames, condition, reading))
+        try:
+            while True:
+                async with condition:
+                    await condition.wait_for(lambda: pending_frames or not reading[0])
+                    if not pending_frames:
+                        break
+                    if self.policy == "coalesce":
+                        batch = list(pending_frames)
+                        pending_frames.clear()
+                    else:
+                        batch = [pending_frames.popleft()]
+                    condition.notify_all()
+                yield await loop.run_in_executor(self._executor, self._track_frames, batch)
+            await reader # Raises the exception of the source, if any
+        finally:
+            reader.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def _read_frames(self, frames, pending_frames, condition, reading):
+        try:
+            async for frame in frames:
+                async with condition:
+                    if self.policy == "drop_stale":
+                        if len(pending_frames) == self.max_pending_frames:
+                            pending_frames.popleft()
+                            self.dropped_frames_count += 1
+                    else:
+                        await condition.wait_for(lambda: len(pending_frames) < self.max_pending_frames)
+                    pending_frames.append(frame)
+                    condition.notify_all()
+        finally:
+            async with condition:
+                reading[0] = False
+                condition.notify_all()
+
+    def _track_frames(self, batch):
+        for frame_index, detections, tips_midpoints in batch:
+            self._track_frame(frame_index, detections, tips_midpoints)
+        return self.last_frame_index, get_result_rows(self.object_tracker)
+
+    def _track_frame(self, frame_index, detections, tips_midpoints):
+        object_tracker = self.object_tracker
+        if self.last_frame_index is None:
+            object_tracker.frame_index = frame_index
+        elif frame_index < object_tracker.frame_index: # Out of order frame, already counted as dropped
+            return
+        while object_tracker.frame_index < frame_index: # Dropped frames
+            object_tracker.increment_frame_index()
+        if isinstance(detections, np.ndarray):
+            object_tracker.register_seen_detections(detections, tips_midpoints, self.conf_threshold)
+        else:
+            object_tracker.register_seen_objects(detections, tips_midpoints)
+        object_tracker.increment_frame_index()
+        self.last_frame_index = frame_index
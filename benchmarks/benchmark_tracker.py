@@ -0,0 +1,143 @@
+"""Per-frame latency, throughput and peak memory of ObjectTracker on synthetic scenes, as JSON.
+Each axis (objects count, labels count, frames count) is swept around the base configuration, e.g.
+    python benchmarks/benchmark_tracker.py --objects 10 100 1000 --labels 1 8 80 --frames 300 3000 --output results.json
+The detector can run on one frame out of --detector-interval only, the other frames going through predict_only, to measure
+the identity stability (created_objects_count) with and without --motion-prediction, e.g. on drifting objects (--drift-speed)"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from object_tracker import ObjectTracker
+from synthetic_scene import SyntheticScene
+from yolo_object import YoloObject
+
+def run_benchmark(objects_count, labels_count, frames_count, api="objects", image_width=1280, image_height=720, seed=0, repeats=1, warmup_frames=20,
+                  detector_interval=1, motion_prediction=False, drift_speed=0):
+    """Tracks the frames of a synthetic scene and returns the configuration and the measured metrics as a dict.
+    api: "objects" for register_seen_objects, "detections" for register_seen_detections.
+    Latencies cover register and increment_frame_index of each frame (or predict_only of the frames skipped by the
+    detector), and are pooled over the repeats. The peak memory is traced in an extra run, since tracing slows down the tracker"""
+    scene = SyntheticScene(objects_count, labels_count, image_width, image_height, seed, drift_speed=drift_speed)
+    frames = [(detections if api == "detections" else [YoloObject.from_np_array(detection) for detection in detections], tips_midpoints) \
+              for detections, tips_midpoints in scene.iter_frames(warmup_frames + frames_count)]
+
+    default_motion_prediction = ObjectTracker.MOTION_PREDICTION
+    ObjectTracker.MOTION_PREDICTION = motion_prediction
+    try:
+        latencies = []
+        for _ in range(repeats):
+            frame_latencies, object_tracker = _track(frames, api, image_width, image_height, detector_interval)
+            latencies.extend(frame_latencies[warmup_frames:])
+        latencies = np.array(latencies)
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        _track(frames, api, image_width, image_height, detector_interval)
+        peak_memory = tracemalloc.get_traced_memory()[1] - memory_before
+        tracemalloc.stop()
+    finally:
+        ObjectTracker.MOTION_PREDICTION = default_motion_prediction
+
+    return {
+        "objects_count": objects_count,
+        "labels_count": labels_count,
+        "frames_count": frames_count,
+        "api": api,
+        "image_size": [image_width, image_height],
+        "seed": seed,
+        "detector_interval": detector_interval,
+        "motion_prediction": motion_prediction,
+        "drift_speed": drift_speed,
+        "repeats": repeats,
+        "detections_per_frame": float(np.mean([len(detections) for detections, _ in frames])),
+        "latency_us": {
+            "mean": float(latencies.mean()*1e6),
+            "p50": float(np.percentile(latencies, 50)*1e6),
+            "p95": float(np.percentile(latencies, 95)*1e6),
+            "p99": float(np.percentile(latencies, 99)*1e6),
+            "max": float(latencies.max()*1e6),
+        },
+        "throughput_fps": float(len(latencies)/latencies.sum()),
+        "peak_memory_bytes": int(peak_memory),
+        "final_tracked_objects_count": len(object_tracker.tracked_objects),
+        "final_expired_objects_count": len(object_tracker.expired_archive),
+        "created_objects_count": object_tracker.next_object_tracker_id,
+    }
+
+def get_environment():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+def _track(frames, api, image_width, image_height, detector_interval=1):
+    object_tracker = ObjectTracker(image_width, image_height)
+    register = object_tracker.register_seen_detections if api == "detections" else object_tracker.register_seen_objects
+    latencies = []
+    for frame_index, (detections, tips_midpoints) in enumerate(frames):
+        start_time = time.perf_counter()
+        if frame_index % detector_interval == 0:
+            register(detections, tips_midpoints)
+            object_tracker.increment_frame_index()
+        else:
+            object_tracker.predict_only(tips_midpoints)
+        latencies.append(time.perf_counter() - start_time)
+    return latencies, object_tracker
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 100, 1000], help="objects counts to sweep")
+    parser.add_argument("--labels", type=int, nargs="+", default=[1, 8, 80], help="labels counts to sweep")
+    parser.add_argument("--frames", type=int, nargs="+", default=[300, 3000], help="frames counts to sweep")
+    parser.add_argument("--base", type=int, nargs=3, default=[100, 8, 300], metavar=("OBJECTS", "LABELS", "FRAMES"), help="base configuration of the sweeps")
+    parser.add_argument("--api", choices=("objects", "detections"), nargs="+", default=["objects", "detections"])
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1280, 720], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--detector-interval", type=int, default=1, help="run the detector on one frame out of this many, predict_only on the others")
+    parser.add_argument("--motion-prediction", action="store_true", help="enable ObjectTracker.MOTION_PREDICTION")
+    parser.add_argument("--drift-speed", type=float, default=0, help="speed in pixels per frame of the objects not in a hand")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="JSON output file, standard output if not specified")
+    args = parser.parse_args()
+
+    base_objects_count, base_labels_count, base_frames_count = args.base
+    configurations = [(objects_count, base_labels_count, base_frames_count) for objects_count in args.objects]
+    configurations += [(base_objects_count, labels_count, base_frames_count) for labels_count in args.labels]
+    configurations += [(base_objects_count, base_labels_count, frames_count) for frames_count in args.frames]
+    configurations = list(dict.fromkeys(configurations)) # The base configuration may appear in several sweeps
+
+    results = []
+    for objects_count, labels_count, frames_count in configurations:
+        for api in args.api:
+            result = run_benchmark(objects_count, labels_count, frames_count, api, *args.image_size, args.seed, args.repeats,
+                                   detector_interval=args.detector_interval, motion_prediction=args.motion_prediction, drift_speed=args.drift_speed)
+            results.append(result)
+            print(f"{api:>10} objects={objects_count:<5} labels={labels_count:<3} frames={frames_count:<5} p50={result['latency_us']['p50']:9.1f}us "
+                  f"p99={result['latency_us']['p99']:9.1f}us {result['throughput_fps']:9.1f}fps created={result['created_objects_count']}", file=sys.stderr)
+
+    report = {"environment": get_environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Compares two JSON reports of benchmark_tracker.py, e.g. of two revisions, configuration by configuration.
+Exits with status 1 if a latency percentile got slower by more than the tolerance
+    python benchmarks/compare_benchmarks.py baseline.json candidate.json --tolerance 0.1"""
+import argparse
+import json
+import sys
+
+CONFIGURATION_KEYS = ("objects_count", "labels_count", "frames_count", "api", "image_size", "seed", "detector_interval", "motion_prediction", "drift_speed")
+# Values of the configuration keys missing from the reports of older revisions
+DEFAULT_CONFIGURATION = {"detector_interval": 1, "motion_prediction": False, "drift_speed": 0}
+COMPARED_PERCENTILES = ("p50", "p95", "p99")
+
+def get_configuration(result):
+    return tuple(json.dumps(result.get(key, DEFAULT_CONFIGURATION.get(key))) for key in CONFIGURATION_KEYS)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown tolerated before reporting a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline_results = {get_configuration(result): result for result in json.load(baseline_file)["results"]}
+        candidate_results = json.load(candidate_file)["results"]
+
+    regressed = False
+    for candidate_result in candidate_results:
+        baseline_result = baseline_results.get(get_configuration(candidate_result))
+        if baseline_result is None:
+            continue
+        ratios = {percentile: candidate_result["latency_us"][percentile]/baseline_result["latency_us"][percentile] for percentile in COMPARED_PERCENTILES}
+        memory_ratio = candidate_result["peak_memory_bytes"]/max(1, baseline_result["peak_memory_bytes"])
+        is_regression = any(ratio > 1 + args.tolerance for ratio in ratios.values())
+        regressed |= is_regression
+        print(f"{candidate_result['api']:>10} objects={candidate_result['objects_count']:<5} labels={candidate_result['labels_count']:<3} "
+              f"frames={candidate_result['frames_count']:<5} " + " ".join(f"{percentile}={ratio:5.2f}x" for percentile, ratio in ratios.items()) +
+              f" memory={memory_ratio:5.2f}x" + (" REGRESSION" if is_regression else ""))
+    sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    main()
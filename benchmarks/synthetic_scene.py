@@ -0,0 +1,132 @@
+import numpy as np
+
+class SyntheticScene:
+    """Deterministic synthetic scene for the tracker benchmarks, the same seed always giving the same frames.
+    objects_count objects of labels_count labels lie on a jittered grid over the image. Each hand repeatedly appears,
+    moves to an object, picks it up, carries it around (mostly occluding it) and releases it somewhere else, then leaves.
+    The detector misses single objects (dropout_probability) and whole frames (frame_dropout_probability),
+    reports some objects twice (duplicate_probability), reports false positives and hides the objects under the hands.
+    Objects are also taken out of the scene and put back, so that tracks expire and come back to track.
+    With drift_speed, the objects not in a hand drift in a constant random direction by drift_speed pixels per frame,
+    wrapping around the image"""
+
+    def __init__(self, objects_count=100, labels_count=8, image_width=1280, image_height=720, seed=0,
+                 dropout_probability=0.05, frame_dropout_probability=0.01, duplicate_probability=0.03, false_positives_rate=0.5,
+                 in_hand_occlusion_probability=0.7, hand_occlusion_probability=0.5, removal_probability=0.002, return_probability=0.02,
+                 hand_appearance_probability=0.05, hand_speed=12, carry_frames=(15, 60), drift_speed=0):
+        self.objects_count = objects_count
+        self.labels_count = labels_count
+        self.image_width = image_width
+        self.image_height = image_height
+        self.seed = seed
+        self.dropout_probability = dropout_probability
+        self.frame_dropout_probability = frame_dropout_probability
+        self.duplicate_probability = duplicate_probability
+        self.false_positives_rate = false_positives_rate
+        self.in_hand_occlusion_probability = in_hand_occlusion_probability
+        self.hand_occlusion_probability = hand_occlusion_probability
+        self.removal_probability = removal_probability
+        self.return_probability = return_probability
+        self.hand_appearance_probability = hand_appearance_probability
+        self.hand_speed = hand_speed
+        self.carry_frames = carry_frames
+        self.drift_speed = drift_speed
+
+    def iter_frames(self, frames_count):
+        """Yields frames_count (detections, tips_midpoints) frames, detections being a (N, 6) array of
+        (label_id, conf, x1, y1, x2, y2) rows in random order and tips_midpoints a (2, 2) array, (0, 0) for a hand not in the image"""
+        rng = np.random.default_rng(self.seed)
+        columns_count = max(1, int(np.ceil(np.sqrt(self.objects_count*self.image_width/self.image_height))))
+        rows_count = int(np.ceil(self.objects_count/columns_count))
+        spacing = np.array((self.image_width/columns_count, self.image_height/rows_count))
+        grid = np.stack(np.divmod(np.arange(self.objects_count), columns_count)[::-1], axis=1)
+        centers = (grid + 0.5)*spacing + rng.uniform(-0.2, 0.2, (self.objects_count, 2))*spacing
+        sizes = rng.uniform(0.3, 0.6, (self.objects_count, 2))*spacing
+        labels = rng.integers(0, self.labels_count, self.objects_count)
+        is_present = np.ones(self.objects_count, dtype=bool)
+        # Drawn from their own generator, so that the other draws do not depend on drift_speed
+        drift_angles = np.random.default_rng((self.seed, 1)).uniform(0, 2*np.pi, self.objects_count)
+        drift_offsets = self.drift_speed*np.column_stack((np.cos(drift_angles), np.sin(drift_angles)))
+        hands = [_Hand(), _Hand()]
+
+        for _ in range(frames_count):
+            is_present ^= np.where(is_present, rng.random(self.objects_count) < self.removal_probability,
+                                   rng.random(self.objects_count) < self.return_probability)
+            tips_midpoints = np.zeros((2, 2), dtype=np.int64)
+            is_carried = np.zeros(self.objects_count, dtype=bool)
+            for hand_index, hand in enumerate(hands):
+                self._move_hand(hand, rng, centers, is_present, hands[1 - hand_index].target)
+                if hand.position is not None:
+                    tips_midpoints[hand_index] = hand.position
+                    if hand.carried_frames_left > 0:
+                        is_carried[hand.target] = True
+            if self.drift_speed:
+                centers[~is_carried] = (centers[~is_carried] + drift_offsets[~is_carried]) % (self.image_width, self.image_height)
+
+            is_detected = is_present & (rng.random(self.objects_count) >= self.dropout_probability)
+            is_detected &= ~is_carried | (rng.random(self.objects_count) >= self.in_hand_occlusion_probability)
+            for tips_midpoint in tips_midpoints[tips_midpoints.any(axis=1)]:
+                is_under_hand = (np.abs(centers - tips_midpoint) < sizes).all(axis=1) & ~is_carried
+                is_detected &= ~is_under_hand | (rng.random(self.objects_count) >= self.hand_occlusion_probability)
+            if rng.random() < self.frame_dropout_probability:
+                is_detected[:] = False
+
+            detected = np.flatnonzero(is_detected)
+            duplicated = detected[rng.random(len(detected)) < self.duplicate_probability]
+            false_positives_count = rng.poisson(self.false_positives_rate)
+            detection_labels = np.concatenate((labels[detected], labels[duplicated], rng.integers(0, self.labels_count, false_positives_count)))
+            detection_centers = np.concatenate((centers[detected] + rng.integers(-2, 3, (len(detected), 2)),
+                                                centers[duplicated] + rng.integers(-4, 5, (len(duplicated), 2)),
+                                                rng.uniform((0, 0), (self.image_width, self.image_height), (false_positives_count, 2))))
+            detection_sizes = np.concatenate((sizes[detected], sizes[duplicated], rng.uniform(0.3, 0.6, (false_positives_count, 2))*spacing))
+            detection_confs = np.concatenate((rng.uniform(0.6, 1, len(detected)), rng.uniform(0.3, 0.7, len(duplicated) + false_positives_count)))
+            detections = np.column_stack((detection_labels, detection_confs, np.floor(detection_centers - detection_sizes/2), np.floor(detection_centers + detection_sizes/2)))
+            yield detections[rng.permutation(len(detections))], tips_midpoints
+
+    def _move_hand(self, hand, rng, centers, is_present, other_hand_target):
+        if hand.position is None:
+            if rng.random() < self.hand_appearance_probability:
+                candidates = np.flatnonzero(is_present)
+                candidates = candidates[candidates != other_hand_target]
+                if len(candidates):
+                    hand.position = rng.uniform((0, 0), (self.image_width, self.image_height))
+                    hand.target = int(rng.choice(candidates))
+                    hand.destination = centers[hand.target].copy()
+            return
+        if hand.carried_frames_left > 0:
+            hand.carried_frames_left -= 1
+            if hand.carried_frames_left == 0: # Release the object and leave
+                hand.target = None
+                hand.destination = rng.uniform((0, 0), (self.image_width, self.image_height))
+        elif hand.target is not None: # Going to the object, which may drift
+            hand.destination = centers[hand.target].copy()
+        arrived = self._step_towards(hand, rng)
+        if hand.carried_frames_left > 0:
+            centers[hand.target] = hand.position
+            if arrived:
+                hand.destination = rng.uniform((0, 0), (self.image_width, self.image_height))
+        elif arrived:
+            if hand.target is None:
+                hand.position = hand.destination = None
+            else: # Pick up the object
+                hand.carried_frames_left = int(rng.integers(self.carry_frames[0], self.carry_frames[1] + 1))
+                hand.destination = rng.uniform((0, 0), (self.image_width, self.image_height))
+
+    def _step_towards(self, hand, rng):
+        """Moves the hand towards its destination, with some jitter. Returns whether it has arrived"""
+        offset = hand.destination - hand.position
+        distance = np.hypot(*offset)
+        if distance <= self.hand_speed:
+            hand.position = hand.destination.copy()
+            return True
+        hand.position = np.clip(hand.position + offset/distance*self.hand_speed + rng.uniform(-2, 2, 2), 0, (self.image_width - 1, self.image_height - 1))
+        return False
+
+class _Hand:
+    __slots__ = ("position", "target", "destination", "carried_frames_left")
+
+    def __init__(self):
+        self.position = None
+        self.target = None
+        self.destination = None
+        self.carried_frames_left = 0
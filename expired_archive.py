@@ -0,0 +1,127 @@
+import heapq
+import weakref
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+ExpiredObject = namedtuple("ExpiredObject", ("tracker_id", "label_id", "conf", "bbox", "last_seen_frame_index", "frames_persistence",
+                                             "in_hand_frames_persistence", "last_revival_frame_index", "expired_frame_index"))
+
+class ExpiredArchive:
+    """Bounded archive of the expired objects, indexed by tracker id.
+    Each object is kept as a compact ExpiredObject tuple. When the archive exceeds max_count, objects are evicted in
+    expiration order ("fifo") or least recently revived first ("lru"). Objects expired more than max_age frames ago are evicted too.
+    If cell_size is given, the objects are also indexed by label and grid cell for find_nearest().
+    views keeps the TrackedObject instances of the expired objects (views detached from the store on expiration, or
+    created by ObjectTracker.expired_objects), as long as they are referenced elsewhere,
+    so that a revived object is the same instance as before its expiration"""
+    EVICTION_POLICIES = ("fifo", "lru")
+
+    def __init__(self, max_count=None, max_age=None, eviction_policy="fifo", cell_size=None):
+        if eviction_policy not in ExpiredArchive.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction_policy!r}, expected one of {ExpiredArchive.EVICTION_POLICIES}")
+        self.max_count = max_count
+        self.max_age = max_age
+        self.eviction_policy = eviction_policy
+        self.cell_size = cell_size
+        self.expired_objects = OrderedDict()
+        self.cells = {}
+        self.views = weakref.WeakValueDictionary()
+        self._revival_heap = []
+        self._revival_heap_counter = 0
+
+    def __len__(self):
+        return len(self.expired_objects)
+
+    def __contains__(self, tracker_id):
+        return tracker_id in self.expired_objects
+
+    def __iter__(self):
+        """Iterates over the expired objects, in expiration order"""
+        return iter(self.expired_objects.values())
+
+    def get(self, tracker_id):
+        return self.expired_objects.get(tracker_id)
+
+    def add(self, removed, frame_index):
+        """Archives the objects expired at frame_index, given as the TrackStore columns of their rows"""
+        for tracker_id, label_id, conf, bbox, last_seen_frame_index, frames_persistence, in_hand_frames_persistence, last_revival_frame_index in zip(
+            removed["tracker_id"].tolist(), removed["label_id"].tolist(), removed["conf"].tolist(), map(tuple, removed["bbox"].tolist()),
+            removed["last_seen_frame_index"].tolist(), removed["frames_persistence"].tolist(),
+            removed["in_hand_frames_persistence"].tolist(), removed["last_revival_frame_index"].tolist()):
+            self._insert(ExpiredObject(tracker_id, label_id, conf, bbox, last_seen_frame_index, frames_persistence,
+                                       in_hand_frames_persistence, last_revival_frame_index, frame_index))
+        self.evict(frame_index)
+
+    def restore(self, expired_objects):
+        """Replaces the archived objects with expired_objects, ExpiredObject tuples in expiration order"""
+        self.expired_objects = OrderedDict()
+        self.cells = {}
+        self.views = weakref.WeakValueDictionary()
+        self._revival_heap = []
+        for expired_object in expired_objects:
+            self._insert(expired_object)
+
+    def pop(self, tracker_id):
+        """Removes and returns the expired object with the specified tracker id, None if not archived"""
+        expired_object = self.expired_objects.pop(tracker_id, None)
+        if expired_object is not None:
+            self._discard(expired_object)
+        return expired_object
+
+    def evict(self, frame_index):
+        if self.max_age is not None:
+            while self.expired_objects:
+                oldest_expired_object = next(iter(self.expired_objects.values()))
+                if oldest_expired_object.expired_frame_index >= frame_index - self.max_age:
+                    break
+                self.pop(oldest_expired_object.tracker_id)
+        if self.max_count is not None:
+            while len(self.expired_objects) > self.max_count:
+                if self.eviction_policy == "lru":
+                    _, _, expired_object = heapq.heappop(self._revival_heap)
+                    if self.expired_objects.get(expired_object.tracker_id) is expired_object:
+                        self.pop(expired_object.tracker_id)
+                else:
+                    self.pop(next(iter(self.expired_objects)))
+        if len(self._revival_heap) > 2*len(self.expired_objects) + 64:
+            self._revival_heap = [item for item in self._revival_heap if self.expired_objects.get(item[2].tracker_id) is item[2]]
+            heapq.heapify(self._revival_heap)
+
+    def find_nearest(self, label_id, center, distance_threshold):
+        """Returns the expired object with the specified label closest to center, within the squared distance_threshold.
+        Only the grid cells within reach of the threshold are visited. Requires cell_size"""
+        reach = int(np.ceil(np.sqrt(distance_threshold)/self.cell_size))
+        _, cell_x, cell_y = self._get_cell(label_id, (center[0], center[1], center[0], center[1]))
+        nearest_expired_object = None
+        nearest_distance = distance_threshold
+        for neighbor_cell_x in range(cell_x - reach, cell_x + reach + 1):
+            for neighbor_cell_y in range(cell_y - reach, cell_y + reach + 1):
+                for tracker_id in self.cells.get((label_id, neighbor_cell_x, neighbor_cell_y), ()):
+                    expired_object = self.expired_objects[tracker_id]
+                    x1, y1, x2, y2 = expired_object.bbox
+                    distance = ((x1 + x2)//2 - center[0])**2 + ((y1 + y2)//2 - center[1])**2
+                    if distance < nearest_distance:
+                        nearest_expired_object = expired_object
+                        nearest_distance = distance
+        return nearest_expired_object
+
+    def _insert(self, expired_object):
+        self.expired_objects[expired_object.tracker_id] = expired_object
+        if self.cell_size:
+            self.cells.setdefault(self._get_cell(expired_object.label_id, expired_object.bbox), set()).add(expired_object.tracker_id)
+        if self.eviction_policy == "lru":
+            heapq.heappush(self._revival_heap, (expired_object.last_revival_frame_index, self._revival_heap_counter, expired_object))
+            self._revival_heap_counter += 1
+
+    def _discard(self, expired_object):
+        if self.cell_size:
+            cell = self._get_cell(expired_object.label_id, expired_object.bbox)
+            cell_tracker_ids = self.cells[cell]
+            cell_tracker_ids.discard(expired_object.tracker_id)
+            if not cell_tracker_ids:
+                del self.cells[cell]
+
+    def _get_cell(self, label_id, bbox):
+        x1, y1, x2, y2 = bbox
+        return label_id, int(((x1 + x2)//2)//self.cell_size), int(((y1 + y2)//2)//self.cell_size)
@@ -1,49 +1,61 @@
+import numpy as np
+
 class HandHelper:
+    LANDMARKS_COUNT = 21
+    # Keypoints computed as the midpoint of two hand landmarks
+    KEYPOINT_LANDMARKS = {
+        "tips_midpoint": (4, 8), # Thumb tip, index finger tip
+        "hand_center": (0, 9), # Wrist, middle finger MCP
+    }
 
     def __init__(self, image_width, image_height):
         self.image_width = image_width
         self.image_height = image_height
-        self.right_hand_landmarks = []
-        self.left_hand_landmarks = []
+        self.landmarks = np.zeros((2, HandHelper.LANDMARKS_COUNT, 3))
+        self.hands_presence = np.zeros(2, dtype=bool)
+        self.keypoints = self.compute_keypoints(self.landmarks, self.hands_presence)
+
+    @property
+    def right_hand_landmarks(self):
+        return self.landmarks[0] if self.hands_presence[0] else []
+
+    @property
+    def left_hand_landmarks(self):
+        return self.landmarks[1] if self.hands_presence[1] else []
 
     def register_hands_landmarks(self, right_hand_landmarks, left_hand_landmarks):
-        self.right_hand_landmarks = right_hand_landmarks
-        self.left_hand_landmarks = left_hand_landmarks
+        """Registers the MediaPipe landmarks of both hands, an empty list for a hand not detected"""
+        landmarks = np.zeros((2, HandHelper.LANDMARKS_COUNT, 3))
+        hands_presence = np.zeros(2, dtype=bool)
+        for i, hand_landmarks in enumerate((right_hand_landmarks, left_hand_landmarks)):
+            if len(hand_landmarks):
+                landmarks[i] = [(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks]
+                hands_presence[i] = True
+        self.register_hands_landmarks_array(landmarks, hands_presence)
+
+    def register_hands_landmarks_array(self, landmarks, hands_presence=None):
+        """landmarks: (2, 21, 3) array with the normalized (x, y, z) landmarks of the right and left hand
+        hands_presence: (2,) boolean mask of the detected hands, all hands are considered present if None"""
+        self.landmarks = np.asarray(landmarks)
+        self.hands_presence = np.ones(2, dtype=bool) if hands_presence is None else np.asarray(hands_presence, dtype=bool)
+        self.keypoints = self.compute_keypoints(self.landmarks, self.hands_presence)
 
     def get_tips_midpoints(self):
-        tips_midpoints = []
-        for i in range(2):
-            if i == 0:
-                hand_landmarks = self.right_hand_landmarks
-            else:
-                hand_landmarks = self.left_hand_landmarks
-            
-            thumb_tip_landmark = hand_landmarks[4]
-            thumb_tip = (thumb_tip_landmark.x, thumb_tip_landmark.y, thumb_tip_landmark.z)
-            index_finder_tip_landmark = hand_landmarks[8]
-            index_finder_tip = (index_finder_tip_landmark.x, index_finder_tip_landmark.y, index_finder_tip_landmark.z)
-
-            tips_midpoint = (int((thumb_tip[0] + index_finder_tip[0])/2*self.image_width), 
-                             int((thumb_tip[1] + index_finder_tip[1])/2*self.image_height))
-            tips_midpoints.append(tips_midpoint)
-        
-        return tips_midpoints
-    
+        """Returns a (2, 2) array with the (x, y) pixel midpoints of the thumb and index finger tips of both hands,
+        (0, 0) for a hand not detected"""
+        return self.keypoints["tips_midpoint"]
+
     def get_hand_centers(self):
-        hand_centers = []
-        for i in range(2):
-            if i == 0:
-                hand_landmarks = self.right_hand_landmarks
-            else:
-                hand_landmarks = self.left_hand_landmarks
-            
-            wrist_landmark = hand_landmarks[0]
-            wrist = (wrist_landmark.x, wrist_landmark.y, wrist_landmark.z)
-            middle_finger_mcp_landmark = hand_landmarks[9]
-            middle_finger_mcp = (middle_finger_mcp_landmark.x, middle_finger_mcp_landmark.y, middle_finger_mcp_landmark.z)
-
-            hand_center = (int((wrist[0] + middle_finger_mcp[0])/2*self.image_width), 
-                           int((wrist[1] + middle_finger_mcp[1])/2*self.image_height))
-            hand_centers.append(hand_center)
-        
-        return hand_centers
+        """Returns a (2, 2) array with the (x, y) pixel centers of both hands, (0, 0) for a hand not detected"""
+        return self.keypoints["hand_center"]
+
+    def compute_keypoints(self, landmarks, hands_presence):
+        """Computes all the keypoints in KEYPOINT_LANDMARKS in one pass.
+        landmarks: (..., 21, 3) array of normalized landmarks, e.g. (frames, hands, 21, 3) for offline processing
+        hands_presence: boolean mask with the leading shape of landmarks
+        Returns a dict with a (..., 2) array of integer pixel coordinates for each keypoint, (0, 0) for absent hands"""
+        landmark_indices = np.array(list(HandHelper.KEYPOINT_LANDMARKS.values()))
+        landmarks = np.asarray(landmarks)[..., landmark_indices, :2]
+        keypoints = (landmarks[..., 0, :] + landmarks[..., 1, :])/2*(self.image_width, self.image_height)
+        keypoints = np.where(np.asarray(hands_presence)[..., np.newaxis, np.newaxis], keypoints, 0).astype(np.int64)
+        return {name: keypoints[..., i, :] for i, name in enumerate(HandHelper.KEYPOINT_LANDMARKS)}
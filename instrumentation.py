@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Phases of a frame, in order: the prediction and the association run in register_seen_objects and the expiration in increment_frame_index
+PHASES = ("prediction", "association", "visible", "right_hand", "left_hand", "back_to_track", "hidden_hand", "release", "expiration")
+COUNTERS = ("matches", "new_tracks", "back_to_track_revivals", "expired_revivals", "hand_swaps", "hand_releases", "false_seen_prunes", "expirations")
+# Upper bounds in seconds of the phase duration histogram buckets
+DEFAULT_BUCKET_BOUNDS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 1e-1)
+
+PHASE_INDICES = {phase: i for i, phase in enumerate(PHASES)}
+COUNTER_INDICES = {counter: i for i, counter in enumerate(COUNTERS)}
+
+class NullInstrumentation:
+    """Instrumentation that records nothing, the default of ObjectTracker"""
+    enabled = False
+
+    def begin_frame(self):
+        pass
+
+    def end_phase(self, phase):
+        pass
+
+    def count(self, counter, value=1):
+        pass
+
+    def end_frame(self, frame_index):
+        pass
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+class TrackerInstrumentation:
+    """Records the duration of each of the PHASES and the COUNTERS of every frame of an ObjectTracker, enabled with
+    object_tracker.instrumentation = TrackerInstrumentation().
+    The last window_frames frames are kept for the rolling percentiles and histograms, and the totals since the start
+    for the Prometheus export. Each hook is called with the metrics dict of every frame (see get_frame_metrics)"""
+    enabled = True
+
+    def __init__(self, window_frames=1000, bucket_bounds=DEFAULT_BUCKET_BOUNDS, hooks=()):
+        self.window_frames = window_frames
+        self.bucket_bounds = np.array(bucket_bounds, dtype=np.float64)
+        self.hooks = list(hooks)
+        self.frames_count = 0
+        self.last_frame_index = None
+        self.window_durations = np.zeros((window_frames, len(PHASES)))
+        self.window_counters = np.zeros((window_frames, len(COUNTERS)), dtype=np.int64)
+        self.total_durations = np.zeros(len(PHASES))
+        self.total_counters = np.zeros(len(COUNTERS), dtype=np.int64)
+        self.total_bucket_counts = np.zeros((len(PHASES), len(self.bucket_bounds) + 1), dtype=np.int64)
+        self.lock = threading.Lock()
+        self._durations = [0.0]*len(PHASES)
+        self._counters = [0]*len(COUNTERS)
+        self._in_frame = False
+        self._phase_start_time = 0.0
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def begin_frame(self):
+        """Starts the timing of a new frame, or resumes the timing of the current one"""
+        if not self._in_frame:
+            self._durations = [0.0]*len(PHASES)
+            self._counters = [0]*len(COUNTERS)
+            self._in_frame = True
+        self._phase_start_time = time.perf_counter()
+
+    def end_phase(self, phase):
+        """Adds the time elapsed since the end of the previous phase (or begin_frame) to phase"""
+        now = time.perf_counter()
+        self._durations[PHASE_INDICES[phase]] += now - self._phase_start_time
+        self._phase_start_time = now
+
+    def count(self, counter, value=1):
+        self._counters[COUNTER_INDICES[counter]] += value
+
+    def end_frame(self, frame_index):
+        durations = np.array(self._durations)
+        counters = np.array(self._counters, dtype=np.int64)
+        with self.lock:
+            window_row = self.frames_count % self.window_frames
+            self.window_durations[window_row] = durations
+            self.window_counters[window_row] = counters
+            self.total_durations += durations
+            self.total_counters += counters
+            self.total_bucket_counts[np.arange(len(PHASES)), np.searchsorted(self.bucket_bounds, durations)] += 1
+            self.frames_count += 1
+            self.last_frame_index = frame_index
+        self._in_frame = False
+        if self.hooks:
+            frame_metrics = self.get_frame_metrics(frame_index, durations, counters)
+            for hook in self.hooks:
+                hook(frame_metrics)
+
+    def get_frame_metrics(self, frame_index, durations, counters):
+        return {
+            "frame_index": frame_index,
+            "duration": float(durations.sum()),
+            "phase_durations": dict(zip(PHASES, durations.tolist())),
+            "counters": dict(zip(COUNTERS, counters.tolist())),
+        }
+
+    def get_summary(self, percentiles=(50, 95, 99)):
+        """Returns the percentiles of the phase durations and the sums of the counters over the window, and the counter totals"""
+        with self.lock:
+            durations = self.window_durations[:min(self.frames_count, self.window_frames)].copy()
+            counters = self.window_counters[:min(self.frames_count, self.window_frames)].copy()
+            total_counters = self.total_counters.copy()
+            frames_count = self.frames_count
+        durations = np.column_stack((durations, durations.sum(axis=1)))
+        duration_percentiles = np.percentile(durations, percentiles, axis=0) if len(durations) else np.zeros((len(percentiles), len(PHASES) + 1))
+        return {
+            "frames_count": frames_count,
+            "window_frames_count": len(counters),
+            "phase_durations": {phase: {f"p{percentile}": float(duration_percentiles[i, phase_index]) for i, percentile in enumerate(percentiles)} \
+                                for phase_index, phase in enumerate(PHASES + ("frame",))},
+            "window_counters": dict(zip(COUNTERS, counters.sum(axis=0).tolist())),
+            "total_counters": dict(zip(COUNTERS, total_counters.tolist())),
+        }
+
+    def get_histograms(self):
+        """Returns a dict with the histogram of the durations of each phase over the window, as the counts of the
+        buckets of bucket_bounds (the last bucket counting the durations above the last bound)"""
+        with self.lock:
+            durations = self.window_durations[:min(self.frames_count, self.window_frames)].copy()
+        bucket_indices = np.searchsorted(self.bucket_bounds, durations)
+        return {phase: np.bincount(bucket_indices[:, phase_index], minlength=len(self.bucket_bounds) + 1).tolist() for phase_index, phase in enumerate(PHASES)}
+
+    def get_prometheus_text(self):
+        """Returns the metrics since the start in the Prometheus text exposition format"""
+        with self.lock:
+            total_durations = self.total_durations.copy()
+            total_counters = self.total_counters.copy()
+            cumulative_bucket_counts = np.cumsum(self.total_bucket_counts, axis=1)
+            frames_count = self.frames_count
+        lines = ["# HELP object_tracker_phase_seconds Duration of the tracking phases", "# TYPE object_tracker_phase_seconds histogram"]
+        for phase_index, phase in enumerate(PHASES):
+            for bucket_bound, bucket_count in zip(self.bucket_bounds.tolist() + ["+Inf"], cumulative_bucket_counts[phase_index].tolist()):
+                lines.append(f'object_tracker_phase_seconds_bucket{{phase="{phase}",le="{bucket_bound}"}} {bucket_count}')
+            lines.append(f'object_tracker_phase_seconds_sum{{phase="{phase}"}} {total_durations[phase_index]}')
+            lines.append(f'object_tracker_phase_seconds_count{{phase="{phase}"}} {frames_count}')
+        lines += ["# HELP object_tracker_events_total Tracking events", "# TYPE object_tracker_events_total counter"]
+        lines += [f'object_tracker_events_total{{event="{counter}"}} {total_counter}' for counter, total_counter in zip(COUNTERS, total_counters.tolist())]
+        lines += ["# HELP object_tracker_frames_total Frames recorded", "# TYPE object_tracker_frames_total counter", f"object_tracker_frames_total {frames_count}"]
+        return "\n".join(lines) + "\n"
+
+class JsonLinesSink:
+    """Hook appending the metrics of every frame to a file as JSON lines"""
+
+    def __init__(self, file_path):
+        self.file = open(file_path, "a")
+
+    def __call__(self, frame_metrics):
+        self.file.write(json.dumps(frame_metrics) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class MetricsServer:
+    """Serves the metrics of a TrackerInstrumentation over HTTP from a background thread, to be scraped:
+    /metrics in the Prometheus text format, /summary and /histograms as JSON"""
+
+    def __init__(self, instrumentation, host="127.0.0.1", port=9464):
+        self.instrumentation = instrumentation
+        self.server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+        self.server.instrumentation = instrumentation
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        instrumentation = self.server.instrumentation
+        if self.path == "/metrics":
+            body, content_type = instrumentation.get_prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path == "/summary":
+            body, content_type = json.dumps(instrumentation.get_summary()), "application/json"
+        elif self.path == "/histograms":
+            body, content_type = json.dumps({"bucket_bounds": instrumentation.bucket_bounds.tolist(), "histograms": instrumentation.get_histograms()}), "application/json"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,81 @@
+import numpy as np
+
+from association import assign
+from object_tracker import ObjectTracker
+from spatial_grid import STREAM_KEY_STRIDE, get_neighbor_pairs
+from track_store import get_centers
+from yolo_object import split_detections
+
+class MultiStreamTracker:
+    """Tracks many independent camera streams in one process.
+    Each stream has its own ObjectTracker (image size, thresholds, hand slots), while the detections of all the streams
+    are associated with their tracked objects in a single vectorized pass per tick, over the merged grid indexes of the streams"""
+
+    def __init__(self, image_sizes=()):
+        self.object_trackers = []
+        for image_width, image_height in image_sizes:
+            self.add_stream(image_width, image_height)
+
+    def __len__(self):
+        return len(self.object_trackers)
+
+    def __getitem__(self, stream_index):
+        return self.object_trackers[stream_index]
+
+    def add_stream(self, image_width, image_height):
+        """Adds a stream and returns its index. Its thresholds can be adjusted on self[stream_index]"""
+        self.object_trackers.append(ObjectTracker(image_width, image_height))
+        return len(self.object_trackers) - 1
+
+    def register_seen_detections(self, detections, tips_midpoints, conf_threshold=0):
+        """detections: one (N, 6) array of (label_id, conf, x1, y1, x2, y2) rows per stream
+        tips_midpoints: (streams, 2, 2) array with the tips midpoints of both hands of each stream
+        The result for each stream is the same as calling ObjectTracker.register_seen_detections on it"""
+        streams_count = len(self.object_trackers)
+        if not streams_count:
+            return
+        if ObjectTracker.MOTION_PREDICTION:
+            for object_tracker, stream_tips_midpoints in zip(self.object_trackers, tips_midpoints):
+                object_tracker._predict_motion(object_tracker._get_tips_midpoints_array(stream_tips_midpoints))
+        split = [split_detections(stream_detections, conf_threshold) for stream_detections in detections]
+        stores = [object_tracker.store for object_tracker in self.object_trackers]
+
+        detections_counts = np.array([len(stream_labels) for stream_labels, _, _ in split])
+        tracks_counts = np.array([store.size for store in stores])
+        detection_offsets = np.cumsum(detections_counts) - detections_counts
+        track_offsets = np.cumsum(tracks_counts) - tracks_counts
+        stream_of_detection = np.repeat(np.arange(streams_count), detections_counts)
+
+        # Cell keys are offset by stream, so that the grid indexes of the streams concatenate into one sorted index
+        detection_labels = np.concatenate([stream_labels for stream_labels, _, _ in split])
+        detection_centers = get_centers(np.concatenate([stream_bboxes for _, _, stream_bboxes in split]))
+        detection_keys = np.concatenate([store.grid.get_cell_keys(detection_centers[detection_offset:detection_offset + detections_count]) \
+                                         for store, detection_offset, detections_count in zip(stores, detection_offsets, detections_counts)])
+        detection_keys += stream_of_detection*STREAM_KEY_STRIDE
+        sorted_keys = np.concatenate([store.grid.sorted_keys + stream_index*STREAM_KEY_STRIDE for stream_index, store in enumerate(stores)])
+        sorted_rows = np.concatenate([store.grid.sorted_rows + track_offset for store, track_offset in zip(stores, track_offsets)])
+        reach = max(store.grid.get_reach(object_tracker.tracking_distance_threshold) for store, object_tracker in zip(stores, self.object_trackers))
+        detection_indices, track_indices = get_neighbor_pairs(detection_keys, sorted_keys, sorted_rows, reach)
+
+        track_labels = np.concatenate([store.label_id[:store.size] for store in stores])
+        track_centers = np.concatenate([store.center[:store.size] for store in stores])
+        same_label = detection_labels[detection_indices] == track_labels[track_indices]
+        tracking_distance_thresholds = np.array([object_tracker.tracking_distance_threshold for object_tracker in self.object_trackers])
+        detection_indices, track_indices, distances = assign(detection_indices[same_label], track_indices[same_label], detection_centers, track_centers, tracking_distance_thresholds[stream_of_detection])
+
+        bounds = np.searchsorted(detection_indices, np.append(detection_offsets, len(detection_labels)))
+        for stream_index, object_tracker in enumerate(self.object_trackers):
+            matches = slice(bounds[stream_index], bounds[stream_index + 1])
+            association = (detection_indices[matches] - detection_offsets[stream_index], track_indices[matches] - track_offsets[stream_index], distances[matches])
+            stream_labels, stream_confs, stream_bboxes = split[stream_index]
+            stream_centers = detection_centers[detection_offsets[stream_index]:detection_offsets[stream_index] + detections_counts[stream_index]]
+            object_tracker._register_associated_detections(stream_labels, stream_confs, stream_bboxes, stream_centers, association, tips_midpoints[stream_index])
+
+    def predict_only(self, tips_midpoints):
+        """Advances the tracked objects of every stream by one camera frame without detections, see ObjectTracker.predict_only"""
+        for object_tracker, stream_tips_midpoints in zip(self.object_trackers, tips_midpoints):
+            object_tracker.predict_only(stream_tips_midpoints)
+
+    def increment_frame_index(self):
+        for object_tracker in self.object_trackers:
+            object_tracker.increment_frame_index()
@@ -1,6 +1,13 @@
 import numpy as np
 
+from association import assign, get_squared_distances
+from expired_archive import ExpiredArchive
+from instrumentation import NULL_INSTRUMENTATION
+from track_store import TrackStore, get_centers
+from tracker_events import (BACK_TO_TRACK, CONFIRMED, CREATED, EVENT_DTYPE, EXPIRED, FALSE_SEEN_DROPPED, FORCED_IN_HAND, HIDDEN, PICKED_UP,
+                            RELEASED, REVIVED, STABLY_HELD, VISIBLE, make_events)
 from tracked_object import TrackedObject
+from yolo_object import split_detections
 
 class ObjectTracker:
     TRACKING_DISTANCE_PERCENTAGE_OF_WIDTH = 0.08
@@ -13,267 +20,465 @@ class ObjectTracker:
     PATIENT_COEFFICIENT_NOT_SEEN_IN_HAND = 2
     STABLE_IN_HAND_FRAMES_PATIENCE = 5
 
+    EXPIRED_OBJECTS_MAX_COUNT = 1000
+    EXPIRED_OBJECTS_MAX_AGE_FRAMES = None
+    EXPIRED_OBJECTS_EVICTION_POLICY = "fifo"
+    REVIVE_EXPIRED_OBJECTS = False
+
+    MOTION_PREDICTION = False
+    MOTION_VELOCITY_GAIN = 0.5
+
+    THRESHOLD_NAMES = ("tracking_distance_threshold", "moving_distance_threshold", "in_hand_distance_threshold", "back_to_track_distance_threshold")
+
     def __init__(self, image_width, image_height):
         self.image_width = image_width
         self.image_height = image_height
-        self.tracked_objects = []
-        self.expired_objects = []
+        self.store = TrackStore(cell_size=max(1, int(ObjectTracker.TRACKING_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)))
+        self.expired_archive = ExpiredArchive(ObjectTracker.EXPIRED_OBJECTS_MAX_COUNT, ObjectTracker.EXPIRED_OBJECTS_MAX_AGE_FRAMES, ObjectTracker.EXPIRED_OBJECTS_EVICTION_POLICY,
+                                              cell_size=self.store.grid.cell_size)
         self.frame_index = 0
         self.next_object_tracker_id = 0
-        self.right_hand_tracked_object = None
-        self.left_hand_tracked_object = None
+        self.hand_tracker_ids = [None, None]
+        self.previous_tips_midpoints = np.zeros((2, 2))
+        self.instrumentation = NULL_INSTRUMENTATION
+        self.event_subscribers = []
+        self._pending_events = []
 
         self.tracking_distance_threshold = int(ObjectTracker.TRACKING_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
         self.moving_distance_threshold = int(ObjectTracker.MOVING_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
         self.in_hand_distance_threshold = int(ObjectTracker.IN_HAND_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
         self.back_to_track_distance_threshold = int(ObjectTracker.BACK_TO_TRACK_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
-        
+
+    @property
+    def tracked_objects(self):
+        return [self.store.view(tracker_id) for tracker_id in self.store.tracker_id[:self.store.size].tolist()]
+
+    @property
+    def expired_objects(self):
+        """The expired objects, each one being the same TrackedObject instance as long as it is referenced, so that a
+        revived object (e.g. by force_object_in_hand) is the instance the caller holds"""
+        expired_objects = []
+        for expired_object in self.expired_archive:
+            tracked_object = self.expired_archive.views.get(expired_object.tracker_id)
+            if tracked_object is None:
+                tracked_object = TrackedObject.from_values(expired_object.tracker_id, self._get_expired_object_values(expired_object))
+                self.expired_archive.views[expired_object.tracker_id] = tracked_object
+            expired_objects.append(tracked_object)
+        return expired_objects
+
+    @property
+    def right_hand_tracked_object(self):
+        return self._get_hand_tracked_object(0)
+
+    @right_hand_tracked_object.setter
+    def right_hand_tracked_object(self, tracked_object):
+        self.hand_tracker_ids[0] = None if tracked_object is None else tracked_object.tracker_id
+
+    @property
+    def left_hand_tracked_object(self):
+        return self._get_hand_tracked_object(1)
+
+    @left_hand_tracked_object.setter
+    def left_hand_tracked_object(self, tracked_object):
+        self.hand_tracker_ids[1] = None if tracked_object is None else tracked_object.tracker_id
+
     def register_seen_objects(self, seen_yolo_objects, tips_midpoints):
-        yolo_objects_to_track = list(seen_yolo_objects)
-        already_tracked_object_ids = []
-        
-        # Visible objects logic
-        visible_tracked_objects = []
-        visible_tracked_objects_hands_distances = []
-        visible_tracked_objects_closest_hands = []
-        visible_object_indices = []
-        for i, yolo_object in enumerate(yolo_objects_to_track):
-            closest_tracked_object, distance = self._get_closest_tracked_object(yolo_object, already_tracked_object_ids)
-            if closest_tracked_object is not None:
-                if distance < self.tracking_distance_threshold:
-                    closest_tracked_object.yolo_object = yolo_object
-                    closest_tracked_object.last_seen_frame_index = self.frame_index
-                    if closest_tracked_object.frames_persistence < ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE:
-                        closest_tracked_object.frames_persistence += 1
-                    closest_tracked_object.is_visible = True
-                    closest_tracked_object.is_moving = False if distance < self.moving_distance_threshold else True
-
-                    visible_tracked_objects.append(closest_tracked_object)
-                    right_hand_distance = self._get_distance_between_object_centers(tips_midpoints[0], closest_tracked_object.yolo_object.get_center())
-                    left_hand_distance = self._get_distance_between_object_centers(tips_midpoints[1], closest_tracked_object.yolo_object.get_center())
-                    if right_hand_distance <= left_hand_distance:
-                        visible_tracked_objects_hands_distances.append(right_hand_distance)
-                        visible_tracked_objects_closest_hands.append(0)
-                    else:
-                        visible_tracked_objects_hands_distances.append(left_hand_distance)
-                        visible_tracked_objects_closest_hands.append(1)
+        seen_yolo_objects = list(seen_yolo_objects)
+        detection_labels = np.array([yolo_object.label_id for yolo_object in seen_yolo_objects], dtype=np.int64)
+        detection_confs = np.array([yolo_object.conf for yolo_object in seen_yolo_objects], dtype=np.float64)
+        detection_bboxes = np.array([(yolo_object.x1, yolo_object.y1, yolo_object.x2, yolo_object.y2) for yolo_object in seen_yolo_objects], dtype=np.float64).reshape(-1, 4)
+        self._register_detections(detection_labels, detection_confs, detection_bboxes, tips_midpoints)
 
-                    already_tracked_object_ids.append(closest_tracked_object.tracker_id)
-                    visible_object_indices.append(i)
+    def register_seen_detections(self, detections, tips_midpoints, conf_threshold=0):
+        """Bulk variant of register_seen_objects that does not need a YoloObject for each detection.
+        detections: (N, 6) array of (label_id, conf, x1, y1, x2, y2) rows, the format of YoloObject.get_np_array.
+        Any array-like is accepted without copying (e.g. a view of a pinned or shared memory buffer).
+        Only detections with confidence above conf_threshold are registered"""
+        detection_labels, detection_confs, detection_bboxes = split_detections(detections, conf_threshold)
+        self._register_detections(detection_labels, detection_confs, detection_bboxes, tips_midpoints)
 
-        for i in sorted(visible_object_indices, reverse=True):
-            yolo_objects_to_track.pop(i)
+    @classmethod
+    def from_state(cls, state):
+        """Creates a tracker from a state returned by get_state, e.g. in a standby process"""
+        object_tracker = cls(int(state["image_width"]), int(state["image_height"]))
+        object_tracker.frame_index = int(state["frame_index"])
+        object_tracker.next_object_tracker_id = int(state["next_object_tracker_id"])
+        object_tracker.hand_tracker_ids = [None if tracker_id < 0 else tracker_id for tracker_id in state["hand_tracker_ids"].tolist()]
+        object_tracker.previous_tips_midpoints = np.array(state["previous_tips_midpoints"], dtype=np.float64)
+        for name in ObjectTracker.THRESHOLD_NAMES:
+            setattr(object_tracker, name, int(state[name]))
+        object_tracker.store.restore({name: state[f"store_{name}"] for name in TrackStore.STATE_COLUMNS})
+        object_tracker.expired_archive.restore(state["expired_objects"])
+        return object_tracker
 
-        # Hand association
-        for i in np.argsort(visible_tracked_objects_hands_distances):
-            if visible_tracked_objects_hands_distances[i] < self.in_hand_distance_threshold:
-                if visible_tracked_objects_closest_hands[i] == 0:
-                    in_hand_visible_tracked_object = visible_tracked_objects[i]
-                    if self.right_hand_tracked_object is not None and self.right_hand_tracked_object.tracker_id == in_hand_visible_tracked_object.tracker_id: # Object already in the hand
-                        if self.right_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-                            self.right_hand_tracked_object.in_hand_frames_persistence += 1
-                        break
-                    elif self.right_hand_tracked_object is None or self.right_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE: # New object in the hand
-                        self.right_hand_tracked_object = in_hand_visible_tracked_object
-                        self.right_hand_tracked_object.in_hand_frames_persistence = 1
-                        break
-            else:
-                break
+    def get_state(self):
+        """Returns a copy of the full state of the tracker as a dict: tracked objects (store_ column arrays), expired
+        objects (ExpiredObject tuples, in expiration order), hand slots, frame index, next tracker id and thresholds.
+        It only copies arrays and references to immutable tuples, so that it can be called on the hot path"""
+        state = {
+            "image_width": self.image_width,
+            "image_height": self.image_height,
+            "frame_index": self.frame_index,
+            "next_object_tracker_id": self.next_object_tracker_id,
+            "hand_tracker_ids": np.array([-1 if tracker_id is None else tracker_id for tracker_id in self.hand_tracker_ids], dtype=np.int64),
+            "previous_tips_midpoints": self.previous_tips_midpoints.copy(),
+            "expired_objects": tuple(self.expired_archive),
+        }
+        for name in ObjectTracker.THRESHOLD_NAMES:
+            state[name] = getattr(self, name)
+        for name in TrackStore.STATE_COLUMNS:
+            state[f"store_{name}"] = getattr(self.store, name)[:self.store.size].copy()
+        return state
 
-        for i in np.argsort(visible_tracked_objects_hands_distances):
-            if visible_tracked_objects_hands_distances[i] < self.in_hand_distance_threshold:
-                if visible_tracked_objects_closest_hands[i] == 1:
-                    in_hand_visible_tracked_object = visible_tracked_objects[i]
-                    if self.left_hand_tracked_object is not None and self.left_hand_tracked_object.tracker_id == in_hand_visible_tracked_object.tracker_id: # Object already in the hand
-                        if self.left_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-                            self.left_hand_tracked_object.in_hand_frames_persistence += 1
-                        break
-                    elif self.left_hand_tracked_object is None or self.left_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE: # New object in the hand
-                        self.left_hand_tracked_object = in_hand_visible_tracked_object
-                        self.left_hand_tracked_object.in_hand_frames_persistence = 1
-                        break
-            else:
-                break
+    def subscribe(self, subscriber):
+        """Calls subscriber with the batch of events of every frame, at the end of increment_frame_index.
+        The batch is a read-only structured array of tracker_events.EVENT_DTYPE, shared by all the subscribers"""
+        self.event_subscribers.append(subscriber)
 
-        # Back to track from hand hide logic or create a new tracked object
-        for yolo_object in yolo_objects_to_track:
-            back_to_track_tracked_object = None
-            if self.right_hand_tracked_object is not None \
-               and not self.right_hand_tracked_object.is_visible \
-               and (not any(tips_midpoints[0]) or self._get_distance_between_object_centers(tips_midpoints[0], yolo_object.get_center()) < self.back_to_track_distance_threshold) \
-               and self.right_hand_tracked_object.yolo_object.label_id == yolo_object.label_id:
-                back_to_track_tracked_object = self.right_hand_tracked_object
-            elif self.left_hand_tracked_object is not None \
-               and not self.left_hand_tracked_object.is_visible \
-               and (not any(tips_midpoints[1]) or self._get_distance_between_object_centers(tips_midpoints[1], yolo_object.get_center()) < self.back_to_track_distance_threshold) \
-               and self.left_hand_tracked_object.yolo_object.label_id == yolo_object.label_id:
-                back_to_track_tracked_object = self.left_hand_tracked_object
-
-            if back_to_track_tracked_object is not None:
-                back_to_track_tracked_object.yolo_object = yolo_object
-                back_to_track_tracked_object.last_seen_frame_index = self.frame_index
-                if back_to_track_tracked_object.frames_persistence < ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE:
-                    back_to_track_tracked_object.frames_persistence += 1
-                back_to_track_tracked_object.is_visible = True
-                back_to_track_tracked_object.is_moving = True
-                
-                already_tracked_object_ids.append(back_to_track_tracked_object.tracker_id)
-            else:
-                double_detected_object = False
-                for tracked_object in self.tracked_objects:
-                    if tracked_object.tracker_id in already_tracked_object_ids and tracked_object.yolo_object.label_id == yolo_object.label_id and tracked_object.frames_persistence >= ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE:
-                        distance = self._get_distance_between_object_centers(tracked_object.yolo_object.get_center(), yolo_object.get_center())
-                        if distance < self.tracking_distance_threshold:
-                            double_detected_object = True
-                            break
-                if not double_detected_object:
-                    new_tracked_object = self._register_new_tracked_object(yolo_object)
-                    already_tracked_object_ids.append(new_tracked_object.tracker_id)
-        
-        # Hidden objects logic (possible hidden from hand track logic)
-        hidden_objects = []
-        hidden_objects_hands_distances = []
-        hidden_objects_closest_hands = []
-        for tracked_object in self.tracked_objects:
-            if tracked_object.tracker_id not in already_tracked_object_ids:
-                tracked_object.is_visible = False
-                tracked_object.is_moving = True
-
-                hidden_objects.append(tracked_object)
-                right_hand_distance = self._get_distance_between_object_centers(tips_midpoints[0], tracked_object.yolo_object.get_center())
-                left_hand_distance = self._get_distance_between_object_centers(tips_midpoints[1], tracked_object.yolo_object.get_center())
-                if right_hand_distance <= left_hand_distance:
-                    hidden_objects_hands_distances.append(right_hand_distance)
-                    hidden_objects_closest_hands.append(0)
-                else:
-                    hidden_objects_hands_distances.append(left_hand_distance)
-                    hidden_objects_closest_hands.append(1)
-
-                already_tracked_object_ids.append(tracked_object.tracker_id)
-
-        if self.right_hand_tracked_object is None or self.right_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-            for i in np.argsort(hidden_objects_hands_distances):
-                if hidden_objects_hands_distances[i] < self.in_hand_distance_threshold:
-                    if hidden_objects_closest_hands[i] == 0:
-                        self.right_hand_tracked_object = hidden_objects[i]
-                        if self.right_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-                            self.right_hand_tracked_object.in_hand_frames_persistence += 1
-                        break
-                else:
-                    break
-        if self.left_hand_tracked_object is None or self.left_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-            for i in np.argsort(hidden_objects_hands_distances):
-                if hidden_objects_hands_distances[i] < self.in_hand_distance_threshold:
-                    if hidden_objects_closest_hands[i] == 1:
-                        self.left_hand_tracked_object = hidden_objects[i]
-                        if self.left_hand_tracked_object.in_hand_frames_persistence < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
-                            self.left_hand_tracked_object.in_hand_frames_persistence += 1
-                        break
-                else:
-                    break
+    def unsubscribe(self, subscriber):
+        self.event_subscribers.remove(subscriber)
 
-        # Hand release logic
-        if any(tips_midpoints[0]) \
-           and self.right_hand_tracked_object is not None \
-           and self.right_hand_tracked_object.is_visible \
-           and self._get_distance_between_object_centers(tips_midpoints[0], self.right_hand_tracked_object.yolo_object.get_center()) >= self.in_hand_distance_threshold:
-            self.right_hand_tracked_object.in_hand_frames_persistence = 0
-            self.right_hand_tracked_object = None
-
-        if any(tips_midpoints[1]) \
-           and self.left_hand_tracked_object is not None \
-           and self.left_hand_tracked_object.is_visible \
-           and self._get_distance_between_object_centers(tips_midpoints[1], self.left_hand_tracked_object.yolo_object.get_center()) >= self.in_hand_distance_threshold:
-            self.left_hand_tracked_object.in_hand_frames_persistence = 0
-            self.left_hand_tracked_object = None
+    def predict_only(self, tips_midpoints):
+        """Advances the tracked objects by one camera frame on which the detector did not run.
+        Each object moves by its velocity (estimated if MOTION_PREDICTION is enabled) and the object in a visible hand follows its tips midpoint.
+        The frame index is not incremented, so the frame indices and the patiences count the frames with detections"""
+        self._predict_motion(self._get_tips_midpoints_array(tips_midpoints))
 
     def increment_frame_index(self):
+        self.instrumentation.begin_frame()
         self._check_false_seen_and_expiration()
+        self.instrumentation.end_phase("expiration")
+        self.instrumentation.end_frame(self.frame_index)
         self.frame_index += 1
+        if self.event_subscribers:
+            self._publish_events()
 
     def force_object_in_hand(self, hand_index, reference_tracked_object):
         """hand_index: 0 = right, 1 = left"""
         tracked_object = self.get_tracked_object_by_id(reference_tracked_object.tracker_id)
         if tracked_object is None:
-            for i in range(len(self.expired_objects)):
-                if self.expired_objects[i].tracker_id == reference_tracked_object.tracker_id:
-                    tracked_object = self.expired_objects.pop(i)
-                    self.tracked_objects.append(tracked_object)
-                    break
+            expired_object = self.expired_archive.pop(reference_tracked_object.tracker_id)
+            if expired_object is not None:
+                revived_row = self._revive_expired_object(expired_object)
+                self._emit_row_events(REVIVED, revived_row)
+                tracked_object = self.store.view(self.store.tracker_id[revived_row].item())
         if tracked_object is None:
             print("Error: No expired object can be found with specified tracker id.")
             return
-        
+
+        if tracked_object.is_visible:
+            self._emit_row_events(HIDDEN, self.store.row_of[tracked_object.tracker_id])
         tracked_object.last_seen_frame_index = self.frame_index
         tracked_object.frames_persistence = max(tracked_object.frames_persistence, ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE)
         tracked_object.in_hand_frames_persistence = max(tracked_object.in_hand_frames_persistence, ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE)
         tracked_object.is_visible = False
         tracked_object.is_moving = True
-        if hand_index == 0:
-            self.right_hand_tracked_object = tracked_object
-        elif hand_index == 1:
-            self.left_hand_tracked_object = tracked_object
+        if hand_index in (0, 1):
+            self._put_in_hand(hand_index, self.store.row_of[tracked_object.tracker_id], FORCED_IN_HAND)
 
     def get_tracked_object_by_id(self, tracker_id):
-        for tracked_object in self.tracked_objects:
-            if tracked_object.tracker_id == tracker_id:
-                return tracked_object
-        return None
-    
-    def _get_closest_tracked_object(self, yolo_object, already_tracked_object_ids):
-        """Returns the closest tracked object to a specified YoloObject and the respective distance"""
-        near_tracked_objects = []
-        distances = []
-        yolo_object_center = yolo_object.get_center()
-        for tracked_object in self.tracked_objects:
-            if tracked_object.tracker_id not in already_tracked_object_ids:
-                if tracked_object.yolo_object.label_id == yolo_object.label_id:
-                    distance = self._get_distance_between_object_centers(yolo_object_center, tracked_object.yolo_object.get_center())
-                    near_tracked_objects.append(tracked_object)
-                    distances.append(distance)
-
-        if near_tracked_objects:
-            closest_object_index = np.argmin(distances)
-            return near_tracked_objects[closest_object_index], distances[closest_object_index]
-        else:
-            return None, None
-
-    def _register_new_tracked_object(self, yolo_object):
-        tracked_object = TrackedObject(yolo_object, self.next_object_tracker_id, self.frame_index)
+        return self.store.view(tracker_id)
+
+    def _register_detections(self, detection_labels, detection_confs, detection_bboxes, tips_midpoints):
+        store = self.store
+        self.instrumentation.begin_frame()
+        if ObjectTracker.MOTION_PREDICTION:
+            self._predict_motion(self._get_tips_midpoints_array(tips_midpoints))
+        self.instrumentation.end_phase("prediction")
+        detection_centers = get_centers(detection_bboxes)
+        detection_indices, track_rows = store.grid.query(detection_centers, self.tracking_distance_threshold)
+        same_label = detection_labels[detection_indices] == store.label_id[track_rows]
+        association = assign(detection_indices[same_label], track_rows[same_label], detection_centers, store.center[:store.size], self.tracking_distance_threshold)
+        self.instrumentation.end_phase("association")
+        self._register_associated_detections(detection_labels, detection_confs, detection_bboxes, detection_centers, association, tips_midpoints)
+
+    def _register_associated_detections(self, detection_labels, detection_confs, detection_bboxes, detection_centers, association, tips_midpoints):
+        """Updates the tracked objects given the result of assign() between the detections and the stored objects"""
+        store = self.store
+        instrumentation = self.instrumentation
+        instrumentation.begin_frame()
+        tips_midpoints_array = self._get_tips_midpoints_array(tips_midpoints)
+        hands_visible = np.any(tips_midpoints_array != 0, axis=1)
+        tracks_count = store.size
+        already_tracked = np.zeros(tracks_count + len(detection_labels), dtype=bool)
+
+        # Visible objects logic
+        detection_indices, visible_rows, distances = association
+        is_moving = distances >= self.moving_distance_threshold
+        if ObjectTracker.MOTION_PREDICTION: # Alpha-beta update of the velocities, the boxes being set to the detections
+            residuals = detection_centers[detection_indices] - store.center[visible_rows]
+            store.velocity[visible_rows] += ObjectTracker.MOTION_VELOCITY_GAIN*residuals/np.maximum(store.motion_frames[visible_rows], 1)[:, np.newaxis]
+            is_moving |= np.sum(store.velocity[visible_rows]**2, axis=1) >= self.moving_distance_threshold
+        store.motion_frames[visible_rows] = 0
+        if self.event_subscribers:
+            self._emit_row_events(VISIBLE, visible_rows[~store.is_visible[visible_rows]])
+        store.set_boxes(visible_rows, detection_confs[detection_indices], detection_bboxes[detection_indices])
+        store.last_seen_frame_index[visible_rows] = self.frame_index
+        self._increment_frames_persistence(visible_rows)
+        store.is_visible[visible_rows] = True
+        store.is_moving[visible_rows] = is_moving
+        already_tracked[visible_rows] = True
+        instrumentation.count("matches", len(visible_rows))
+        instrumentation.end_phase("visible")
+
+        # Hand association
+        self._associate_visible_objects_with_hand(0, visible_rows, tips_midpoints_array)
+        instrumentation.end_phase("right_hand")
+        self._associate_visible_objects_with_hand(1, visible_rows, tips_midpoints_array)
+        instrumentation.end_phase("left_hand")
+
+        # Back to track from hand hide logic or create a new tracked object
+        unmatched_detections = np.ones(len(detection_labels), dtype=bool)
+        unmatched_detections[detection_indices] = False
+        for detection_index in np.flatnonzero(unmatched_detections):
+            label_id = detection_labels[detection_index]
+            detection_center = detection_centers[detection_index]
+            back_to_track_row = None
+            for hand_index in range(2):
+                hand_row = self._get_hand_row(hand_index)
+                if hand_row is not None \
+                   and not store.is_visible[hand_row] \
+                   and (not hands_visible[hand_index] or self._get_distance_between_object_centers(tips_midpoints_array[hand_index], detection_center) < self.back_to_track_distance_threshold) \
+                   and store.label_id[hand_row] == label_id:
+                    back_to_track_row = hand_row
+                    back_to_track_hand_index = hand_index
+                    break
+
+            if back_to_track_row is not None:
+                store.set_boxes(back_to_track_row, detection_confs[detection_index], detection_bboxes[detection_index])
+                store.last_seen_frame_index[back_to_track_row] = self.frame_index
+                self._increment_frames_persistence(back_to_track_row)
+                store.is_visible[back_to_track_row] = True
+                store.is_moving[back_to_track_row] = True
+                store.velocity[back_to_track_row] = 0
+                store.motion_frames[back_to_track_row] = 0
+
+                already_tracked[back_to_track_row] = True
+                instrumentation.count("back_to_track_revivals")
+                self._emit_row_events(BACK_TO_TRACK, back_to_track_row, back_to_track_hand_index)
+            else:
+                _, near_rows = store.grid.query(detection_center[np.newaxis], self.tracking_distance_threshold)
+                confirmed_rows = near_rows[already_tracked[near_rows] \
+                                           & (store.label_id[near_rows] == label_id) \
+                                           & (store.frames_persistence[near_rows] >= ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE)]
+                distances = get_squared_distances(detection_center[np.newaxis], store.center[confirmed_rows])
+                if not np.any(distances < self.tracking_distance_threshold):
+                    expired_object = None
+                    if ObjectTracker.REVIVE_EXPIRED_OBJECTS:
+                        expired_object = self.expired_archive.find_nearest(label_id, detection_center, self.tracking_distance_threshold)
+                    if expired_object is not None: # Reappearing expired object
+                        self.expired_archive.pop(expired_object.tracker_id)
+                        new_row = self._revive_expired_object(expired_object)
+                        store.set_boxes(new_row, detection_confs[detection_index], detection_bboxes[detection_index])
+                        store.last_seen_frame_index[new_row] = self.frame_index
+                        self._increment_frames_persistence(new_row)
+                        store.is_visible[new_row] = True
+                        instrumentation.count("expired_revivals")
+                        self._emit_row_events(REVIVED, new_row)
+                        self._emit_row_events(VISIBLE, new_row)
+                    else:
+                        new_row = self._register_new_tracked_object(label_id, detection_confs[detection_index], detection_bboxes[detection_index])
+                        instrumentation.count("new_tracks")
+                        self._emit_row_events(CREATED, new_row)
+                    already_tracked[new_row] = True
+        instrumentation.end_phase("back_to_track")
+
+        # Hidden objects logic (possible hidden from hand track logic)
+        hidden_rows = np.flatnonzero(~already_tracked[:tracks_count])
+        if self.event_subscribers:
+            self._emit_row_events(HIDDEN, hidden_rows[store.is_visible[hidden_rows]])
+        store.is_visible[hidden_rows] = False
+        store.is_moving[hidden_rows] = True
+        store.velocity[hidden_rows] = 0 # Hidden objects do not coast, their velocity being estimated again once seen
+
+        self._associate_hidden_objects_with_hand(0, hidden_rows, tips_midpoints_array)
+        self._associate_hidden_objects_with_hand(1, hidden_rows, tips_midpoints_array)
+        instrumentation.end_phase("hidden_hand")
+
+        # Hand release logic
+        for hand_index in range(2):
+            hand_row = self._get_hand_row(hand_index)
+            if hands_visible[hand_index] \
+               and hand_row is not None \
+               and store.is_visible[hand_row] \
+               and self._get_distance_between_object_centers(tips_midpoints_array[hand_index], store.center[hand_row]) >= self.in_hand_distance_threshold:
+                store.in_hand_frames_persistence[hand_row] = 0
+                self._emit_row_events(RELEASED, hand_row, hand_index)
+                self.hand_tracker_ids[hand_index] = None
+                instrumentation.count("hand_releases")
+        self.previous_tips_midpoints = tips_midpoints_array
+        instrumentation.end_phase("release")
+
+    def _emit_events(self, event_type, tracker_ids, label_ids, bboxes, hand_index=-1):
+        if self.event_subscribers and len(tracker_ids):
+            self._pending_events.append(make_events(self.frame_index, event_type, tracker_ids, label_ids, bboxes, hand_index))
+
+    def _emit_row_events(self, event_type, rows, hand_index=-1):
+        """Emits an event of event_type for each of the rows (or the single row)"""
+        if self.event_subscribers:
+            rows = np.atleast_1d(rows)
+            self._emit_events(event_type, self.store.tracker_id[rows], self.store.label_id[rows], self.store.bbox[rows], hand_index)
+
+    def _publish_events(self):
+        events = np.concatenate(self._pending_events) if self._pending_events else np.empty(0, dtype=EVENT_DTYPE)
+        events.flags.writeable = False
+        self._pending_events = []
+        for subscriber in self.event_subscribers:
+            subscriber(events)
+
+    def _get_tips_midpoints_array(self, tips_midpoints):
+        return np.array(tips_midpoints[:2], dtype=np.float64).reshape(2, 2)
+
+    def _predict_motion(self, tips_midpoints_array):
+        """Moves every visible object by its velocity (hidden objects have none), and the objects in the hands by the displacement of the tips midpoints
+        when the hand is visible in both the previous and the current frame"""
+        store = self.store
+        offsets = store.velocity[:store.size].copy()
+        for hand_index in range(2):
+            hand_row = self._get_hand_row(hand_index)
+            if hand_row is not None and np.any(tips_midpoints_array[hand_index] != 0) and np.any(self.previous_tips_midpoints[hand_index] != 0):
+                offsets[hand_row] = tips_midpoints_array[hand_index] - self.previous_tips_midpoints[hand_index]
+        moved_rows = np.flatnonzero(np.any(offsets != 0, axis=1))
+        store.move_boxes(moved_rows, offsets[moved_rows])
+        store.motion_frames[:store.size] += 1
+        self.previous_tips_midpoints = tips_midpoints_array
+
+    def _get_hand_row(self, hand_index):
+        tracker_id = self.hand_tracker_ids[hand_index]
+        return None if tracker_id is None else self.store.row_of[tracker_id]
+
+    def _get_hand_tracked_object(self, hand_index):
+        tracker_id = self.hand_tracker_ids[hand_index]
+        return None if tracker_id is None else self.store.view(tracker_id)
+
+    def _increment_frames_persistence(self, rows):
+        frames_persistence = self.store.frames_persistence
+        if self.event_subscribers:
+            rows = np.atleast_1d(rows)
+            self._emit_row_events(CONFIRMED, rows[frames_persistence[rows] == ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE - 1])
+        frames_persistence[rows] = np.where(frames_persistence[rows] < ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE, frames_persistence[rows] + 1, frames_persistence[rows])
+
+    def _get_in_hand_rows(self, hand_index, rows, tips_midpoints_array):
+        """Returns the rows, among the specified ones, of the objects within the in hand distance of the specified hand
+        and closer to it than to the other hand (the right hand being preferred on ties), closest first"""
+        store = self.store
+        positions = np.full(store.size, -1)
+        positions[rows] = np.arange(len(rows))
+        _, near_rows = store.grid.query(tips_midpoints_array[hand_index][np.newaxis], self.in_hand_distance_threshold)
+        near_rows = near_rows[positions[near_rows] >= 0]
+        hands_distances = get_squared_distances(store.center[near_rows], tips_midpoints_array)
+        in_hand = (np.argmin(hands_distances, axis=1) == hand_index) & (hands_distances[:, hand_index] < self.in_hand_distance_threshold)
+        near_rows = near_rows[in_hand]
+        return near_rows[np.lexsort((positions[near_rows], hands_distances[in_hand, hand_index]))]
+
+    def _associate_visible_objects_with_hand(self, hand_index, visible_rows, tips_midpoints_array):
+        in_hand_frames_persistence = self.store.in_hand_frames_persistence
+        for in_hand_visible_row in self._get_in_hand_rows(hand_index, visible_rows, tips_midpoints_array):
+            hand_row = self._get_hand_row(hand_index)
+            if hand_row == in_hand_visible_row: # Object already in the hand
+                self._increment_in_hand_frames_persistence(hand_index, hand_row)
+                break
+            elif hand_row is None or in_hand_frames_persistence[hand_row] < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE: # New object in the hand
+                if hand_row is not None:
+                    self.instrumentation.count("hand_swaps")
+                self._put_in_hand(hand_index, in_hand_visible_row, PICKED_UP)
+                in_hand_frames_persistence[in_hand_visible_row] = 1
+                break
+
+    def _associate_hidden_objects_with_hand(self, hand_index, hidden_rows, tips_midpoints_array):
+        in_hand_frames_persistence = self.store.in_hand_frames_persistence
+        hand_row = self._get_hand_row(hand_index)
+        if hand_row is None or in_hand_frames_persistence[hand_row] < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
+            for in_hand_hidden_row in self._get_in_hand_rows(hand_index, hidden_rows, tips_midpoints_array)[:1]:
+                if hand_row is not None and hand_row != in_hand_hidden_row:
+                    self.instrumentation.count("hand_swaps")
+                self._put_in_hand(hand_index, in_hand_hidden_row, PICKED_UP)
+                self._increment_in_hand_frames_persistence(hand_index, in_hand_hidden_row)
+
+    def _increment_in_hand_frames_persistence(self, hand_index, row):
+        in_hand_frames_persistence = self.store.in_hand_frames_persistence
+        if in_hand_frames_persistence[row] < ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
+            in_hand_frames_persistence[row] += 1
+            if in_hand_frames_persistence[row] == ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE:
+                self._emit_row_events(STABLY_HELD, row, hand_index)
+
+    def _put_in_hand(self, hand_index, row, event_type):
+        """Puts the object of row in the hand, releasing the object previously in it.
+        The event is not emitted for a picked up object already in the hand"""
+        previous_row = self._get_hand_row(hand_index)
+        if previous_row is not None and previous_row != row:
+            self._emit_row_events(RELEASED, previous_row, hand_index)
+        if previous_row != row or event_type != PICKED_UP:
+            self._emit_row_events(event_type, row, hand_index)
+        self.hand_tracker_ids[hand_index] = self.store.tracker_id[row].item()
+
+    def _register_new_tracked_object(self, label_id, conf, bbox):
+        row = self.store.append((self.next_object_tracker_id,), (label_id,), (conf,), (bbox,), self.frame_index)[0]
         self.next_object_tracker_id += 1
-        self.tracked_objects.append(tracked_object)
-        return tracked_object
+        return row
+
+    def _revive_expired_object(self, expired_object):
+        """Moves an object popped from the expired archive back to the tracked objects and returns its row"""
+        values = self._get_expired_object_values(expired_object)
+        values["last_revival_frame_index"] = self.frame_index
+        row = self.store.append_values(expired_object.tracker_id, values)
+        view = self.expired_archive.views.pop(expired_object.tracker_id, None)
+        if view is not None:
+            self.store.attach(view)
+        return row
+
+    def _get_expired_object_values(self, expired_object):
+        return {
+            "label_id": expired_object.label_id,
+            "conf": expired_object.conf,
+            "bbox": expired_object.bbox,
+            "last_seen_frame_index": expired_object.last_seen_frame_index,
+            "frames_persistence": expired_object.frames_persistence,
+            "in_hand_frames_persistence": expired_object.in_hand_frames_persistence,
+            "is_visible": False,
+            "is_moving": True,
+            "last_revival_frame_index": expired_object.last_revival_frame_index,
+            "velocity": (0.0, 0.0),
+        }
 
     def _get_distance_between_object_centers(self, object_center_1, object_center_2):
         return (object_center_1[0] - object_center_2[0])**2 + (object_center_1[1] - object_center_2[1])**2
-    
+
     def _check_false_seen_and_expiration(self):
+        store = self.store
+        tracks_count = store.size
+
         # False seen logic
-        false_seen_objects_indices = []
-        for i, tracked_object in enumerate(self.tracked_objects):
-            if not tracked_object.is_visible and tracked_object.frames_persistence < ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE:
-                false_seen_objects_indices.append(i)
-        for i in sorted(false_seen_objects_indices, reverse=True):
-            self.tracked_objects.pop(i)
+        false_seen = ~store.is_visible[:tracks_count] & (store.frames_persistence[:tracks_count] < ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE)
 
         # Expiration logic
-        expired_object_indices = []
-        for i, tracked_object in enumerate(self.tracked_objects):
-            if (self.right_hand_tracked_object is not None and self.right_hand_tracked_object.tracker_id == tracked_object.tracker_id) or \
-               (self.left_hand_tracked_object is not None and self.left_hand_tracked_object.tracker_id == tracked_object.tracker_id):
-                patience_coefficient = ObjectTracker.PATIENT_COEFFICIENT_NOT_SEEN_IN_HAND
-            else:
-                patience_coefficient = 1
-            if tracked_object.last_seen_frame_index < (self.frame_index - ObjectTracker.EXPIRATION_FRAMES_PATIENCE*patience_coefficient):
-                expired_object_indices.append(i)
-        for i in sorted(expired_object_indices, reverse=True):
-            expired_object = self.tracked_objects.pop(i)
-            self.expired_objects.append(expired_object)
-
-        tracked_object_tracker_ids = []
-        for tracked_object in self.tracked_objects:
-            tracked_object_tracker_ids.append(tracked_object.tracker_id)
-        if self.right_hand_tracked_object is not None and self.right_hand_tracked_object.tracker_id not in tracked_object_tracker_ids:
-            self.right_hand_tracked_object = None
-        elif self.left_hand_tracked_object is not None and self.left_hand_tracked_object.tracker_id not in tracked_object_tracker_ids:
-            self.left_hand_tracked_object = None
+        patience = np.full(tracks_count, ObjectTracker.EXPIRATION_FRAMES_PATIENCE)
+        for hand_index in range(2):
+            hand_row = self._get_hand_row(hand_index)
+            if hand_row is not None:
+                patience[hand_row] = ObjectTracker.EXPIRATION_FRAMES_PATIENCE*ObjectTracker.PATIENT_COEFFICIENT_NOT_SEEN_IN_HAND
+        expired = ~false_seen & (store.last_seen_frame_index[:tracks_count] < self.frame_index - patience)
+
+        if self.event_subscribers:
+            for hand_index in range(2):
+                hand_row = self._get_hand_row(hand_index)
+                if hand_row is not None and (false_seen[hand_row] or expired[hand_row]):
+                    self._emit_row_events(RELEASED, hand_row, hand_index)
+
+        expired_views = [store.views[tracker_id] for tracker_id in store.tracker_id[:tracks_count][expired].tolist() if tracker_id in store.views]
+        removed = store.remove(false_seen | expired)
+        removed_expired = expired[false_seen | expired]
+        if self.event_subscribers:
+            self._emit_events(FALSE_SEEN_DROPPED, removed["tracker_id"][~removed_expired], removed["label_id"][~removed_expired], removed["bbox"][~removed_expired])
+            self._emit_events(EXPIRED, removed["tracker_id"][removed_expired], removed["label_id"][removed_expired], removed["bbox"][removed_expired])
+        if self.instrumentation.enabled:
+            self.instrumentation.count("false_seen_prunes", len(removed_expired) - np.count_nonzero(removed_expired))
+            self.instrumentation.count("expirations", np.count_nonzero(removed_expired))
+        self.expired_archive.add({name: column[removed_expired] for name, column in removed.items()}, self.frame_index)
+        for view in expired_views:
+            if view.tracker_id in self.expired_archive:
+                self.expired_archive.views[view.tracker_id] = view
+
+        for hand_index in range(2):
+            if self.hand_tracker_ids[hand_index] is not None and self.hand_tracker_ids[hand_index] not in store:
+                self.hand_tracker_ids[hand_index] = None
@@ -0,0 +1,250 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from object_tracker import ObjectTracker
+
+# Columns of the rows of a tracking result, hand_index being -1 if the object is not in a hand
+RESULT_COLUMNS = ("tracker_id", "label_id", "conf", "x1", "y1", "x2", "y2", "is_visible", "is_moving", "hand_index")
+
+class SharedRingBuffer:
+    """Ring of fixed-size numpy slots in a shared memory block, with a single writer and any number of readers.
+    Each slot holds a frame index and up to max_rows rows of row_shape. Every reader keeps its own cursor, and
+    the writer never waits: when a reader falls behind by more than slots_count items, the oldest ones are dropped.
+    A per slot version counter (odd while the slot is being written) lets the readers detect overwritten slots"""
+
+    def __init__(self, slots_count, max_rows, row_shape=(), dtype=np.float64, name=None):
+        self.slots_count = slots_count
+        self.max_rows = max_rows
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        create = name is None
+        # Worker processes share the resource tracker of the creating process, which is the only one that unlinks the block
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=create, size=self._get_size())
+        self._map()
+        if create:
+            self.control[:] = 0
+            self.slot_headers[:] = 0
+
+    def __getstate__(self):
+        return (self.slots_count, self.max_rows, self.row_shape, self.dtype.str, self.shared_memory.name)
+
+    def __setstate__(self, state):
+        slots_count, max_rows, row_shape, dtype, name = state
+        self.__init__(slots_count, max_rows, row_shape, dtype, name)
+
+    @property
+    def write_count(self):
+        return int(self.control[0])
+
+    @property
+    def is_closed(self):
+        return bool(self.control[1])
+
+    def close_writing(self):
+        """Signals the readers that no more items will be written"""
+        self.control[1] = 1
+
+    def write(self, frame_index, rows):
+        """Writes rows (at most max_rows of row_shape) in the next slot, overwriting the oldest item"""
+        rows_count = len(rows)
+        if rows_count > self.max_rows:
+            raise ValueError(f"Cannot write {rows_count} rows in a ring buffer with {self.max_rows} rows per slot")
+        write_count = self.control[0]
+        slot = write_count % self.slots_count
+        self.slot_headers[slot, 0] += 1
+        self.slots[slot, :rows_count] = rows
+        self.slot_headers[slot, 1] = frame_index
+        self.slot_headers[slot, 2] = rows_count
+        self.slot_headers[slot, 0] += 1
+        self.control[0] = write_count + 1
+
+    def read(self, cursor):
+        """Reads the item at cursor, the number of items read so far by the calling reader.
+        Returns (frame_index, rows, next_cursor), with frame_index and rows None if no new item is available.
+        Items overwritten before being read are skipped"""
+        while True:
+            write_count = self.control[0]
+            if cursor >= write_count:
+                return None, None, cursor
+            cursor = max(cursor, write_count - self.slots_count)
+            slot = cursor % self.slots_count
+            version = self.slot_headers[slot, 0]
+            frame_index = int(self.slot_headers[slot, 1])
+            rows = self.slots[slot, :self.slot_headers[slot, 2]].copy()
+            if version % 2 == 0 and self.slot_headers[slot, 0] == version and self.control[0] - cursor <= self.slots_count:
+                return frame_index, rows, cursor + 1
+            cursor += 1
+
+    def release(self, unlink=False):
+        self.control = self.slot_headers = self.slots = None
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+
+    def _get_size(self):
+        return 8*2 + 8*3*self.slots_count + self.slots_count*self.max_rows*int(np.prod(self.row_shape, dtype=np.int64))*self.dtype.itemsize
+
+    def _map(self):
+        buffer = self.shared_memory.buf
+        self.control = np.ndarray((2,), dtype=np.int64, buffer=buffer)
+        self.slot_headers = np.ndarray((self.slots_count, 3), dtype=np.int64, buffer=buffer, offset=8*2)
+        self.slots = np.ndarray((self.slots_count, self.max_rows) + self.row_shape, dtype=self.dtype, buffer=buffer, offset=8*2 + 8*3*self.slots_count)
+
+class TrackingPipeline:
+    """Runs detection, hand landmarking and tracking as separate worker processes, exchanging frames, detections,
+    tips midpoints and results through SharedRingBuffer instances (no pickling of the data).
+    detector: callable frame -> (N, 6) array of (label_id, conf, x1, y1, x2, y2) rows
+    hand_detector: callable frame -> (2, 2) array of tips midpoints, e.g. built on HandHelper
+    Both callables are sent once to their worker process, so they must be picklable. Only the max_detections most
+    confident detections of a frame are kept, like the results are cut to max_tracks rows.
+    The tracker processes the frames in frame index order and increments its frame index for the frames that were dropped.
+    Each ring keeps slots_count items, the oldest ones being dropped when a stage falls behind"""
+
+    def __init__(self, image_width, image_height, detector, hand_detector, frame_shape, frame_dtype=np.uint8,
+                 slots_count=4, max_detections=256, max_tracks=256, conf_threshold=0, poll_interval=0.0005):
+        self.image_width = image_width
+        self.image_height = image_height
+        self.detector = detector
+        self.hand_detector = hand_detector
+        self.conf_threshold = conf_threshold
+        self.poll_interval = poll_interval
+        self.frames_ring = SharedRingBuffer(slots_count, 1, frame_shape, frame_dtype)
+        self.detections_ring = SharedRingBuffer(slots_count, max_detections, (6,))
+        self.tips_midpoints_ring = SharedRingBuffer(slots_count, 2, (2,))
+        self.results_ring = SharedRingBuffer(slots_count, max_tracks, (len(RESULT_COLUMNS),))
+        self.next_frame_index = 0
+        self.results_cursor = 0
+        self.workers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self.workers = [
+            multiprocessing.Process(target=_run_frame_worker, args=(self.detector, self.frames_ring, self.detections_ring, self.poll_interval, 1), daemon=True),
+            multiprocessing.Process(target=_run_frame_worker, args=(self.hand_detector, self.frames_ring, self.tips_midpoints_ring, self.poll_interval), daemon=True),
+            multiprocessing.Process(target=_run_tracker_worker, args=(self.image_width, self.image_height, self.conf_threshold, self.detections_ring,
+                                                                      self.tips_midpoints_ring, self.results_ring, self.poll_interval), daemon=True),
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, frame):
+        """Submits the next camera frame and returns its frame index"""
+        frame_index = self.next_frame_index
+        self.frames_ring.write(frame_index, np.asarray(frame)[np.newaxis])
+        self.next_frame_index += 1
+        return frame_index
+
+    def get_result(self, timeout=None):
+        """Returns the next tracking result as (frame_index, rows) with one row of RESULT_COLUMNS per tracked object,
+        results not read in time being dropped. Returns (None, None) if no result is available within timeout.
+        Raises RuntimeError if a worker process failed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            is_closed = self.results_ring.is_closed
+            frame_index, rows, self.results_cursor = self.results_ring.read(self.results_cursor)
+            if frame_index is not None:
+                return frame_index, rows
+            failed_worker = next((worker for worker in self.workers if worker.exitcode), None)
+            if failed_worker is not None:
+                raise RuntimeError(f"Pipeline worker {failed_worker.name} exited with code {failed_worker.exitcode}")
+            if is_closed or (deadline is not None and time.monotonic() >= deadline):
+                return None, None
+            time.sleep(self.poll_interval)
+
+    def stop(self, timeout=5):
+        """Stops the workers once they have processed the submitted frames, then releases the shared memory"""
+        self.frames_ring.close_writing()
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        for ring in (self.frames_ring, self.detections_ring, self.tips_midpoints_ring, self.results_ring):
+            ring.release(unlink=True)
+
+def _run_frame_worker(process_frame, frames_ring, output_ring, poll_interval, conf_column=None):
+    """Writes process_frame of every frame to output_ring. If conf_column is given, only the output_ring.max_rows rows
+    with the highest value in that column are kept, in their order. The output ring is closed even if process_frame fails"""
+    cursor = 0
+    try:
+        while True:
+            is_closed = frames_ring.is_closed
+            frame_index, frames, cursor = frames_ring.read(cursor)
+            if frame_index is None:
+                if is_closed:
+                    break
+                time.sleep(poll_interval)
+                continue
+            rows = process_frame(frames[0])
+            if conf_column is not None and len(rows) > output_ring.max_rows:
+                rows = np.asarray(rows)
+                rows = rows[np.sort(np.argsort(-rows[:, conf_column], kind="stable")[:output_ring.max_rows])]
+            output_ring.write(frame_index, rows)
+    finally:
+        output_ring.close_writing()
+
+def _run_tracker_worker(image_width, image_height, conf_threshold, detections_ring, tips_midpoints_ring, results_ring, poll_interval):
+    object_tracker = ObjectTracker(image_width, image_height)
+    pending_detections = {}
+    pending_tips_midpoints = {}
+    detections_cursor = 0
+    tips_midpoints_cursor = 0
+    try:
+        while True:
+            is_closed = detections_ring.is_closed and tips_midpoints_ring.is_closed
+            detections_cursor, detections_read = _read_available(detections_ring, detections_cursor, pending_detections)
+            tips_midpoints_cursor, tips_midpoints_read = _read_available(tips_midpoints_ring, tips_midpoints_cursor, pending_tips_midpoints)
+
+            # Each ring delivers increasing frame indices, so a frame missing from one of them can no longer be completed
+            # once a later frame is available from both
+            for frame_index in sorted(pending_detections.keys() & pending_tips_midpoints.keys()):
+                while object_tracker.frame_index < frame_index: # Dropped frames
+                    object_tracker.increment_frame_index()
+                object_tracker.register_seen_detections(pending_detections[frame_index], pending_tips_midpoints[frame_index], conf_threshold)
+                results_ring.write(frame_index, get_result_rows(object_tracker)[:results_ring.max_rows])
+                object_tracker.increment_frame_index()
+                for pending in (pending_detections, pending_tips_midpoints):
+                    for pending_frame_index in [pending_frame_index for pending_frame_index in pending if pending_frame_index <= frame_index]:
+                        del pending[pending_frame_index]
+
+            if not detections_read and not tips_midpoints_read:
+                if is_closed:
+                    break
+                time.sleep(poll_interval)
+    finally:
+        results_ring.close_writing()
+
+def _read_available(ring, cursor, pending):
+    """Reads all the available items of ring into the pending dict by frame index. Returns the new cursor and whether any item was read"""
+    read_any = False
+    while True:
+        frame_index, rows, cursor = ring.read(cursor)
+        if frame_index is None:
+            return cursor, read_any
+        pending[frame_index] = rows
+        read_any = True
+
+def get_result_rows(object_tracker):
+    """Returns the current state of object_tracker as an array with one row of RESULT_COLUMNS per tracked object"""
+    store = object_tracker.store
+    rows = np.empty((store.size, len(RESULT_COLUMNS)))
+    rows[:, 0] = store.tracker_id[:store.size]
+    rows[:, 1] = store.label_id[:store.size]
+    rows[:, 2] = store.conf[:store.size]
+    rows[:, 3:7] = store.bbox[:store.size]
+    rows[:, 7] = store.is_visible[:store.size]
+    rows[:, 8] = store.is_moving[:store.size]
+    rows[:, 9] = -1
+    for hand_index, tracker_id in enumerate(object_tracker.hand_tracker_ids):
+        if tracker_id is not None:
+            rows[store.row_of[tracker_id], 9] = hand_index
+    return rows
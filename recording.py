@@ -0,0 +1,172 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from object_tracker import ObjectTracker
+
+RECORDING_VERSION = 1
+# Columns of the frames file: frame index, end row of the frame detections in the detections file, 0 for a predict only frame
+FRAME_COLUMNS = ("frame_index", "detections_end", "has_detections")
+
+class TrackerRecorder:
+    """Records the inputs of an ObjectTracker in a directory of append-only little-endian columnar files:
+    detections.bin: float64 (label_id, conf, x1, y1, x2, y2) rows of all the frames, one after the other
+    tips_midpoints.bin: float64 (2, 2) tips midpoints of each frame
+    frames.bin: int64 FRAME_COLUMNS rows, written last, so that an interrupted recording is valid up to its last complete frame
+    header.json: image size and format version
+    If directory already holds a recording of the same image size, the frames are appended to it, after its last complete frame"""
+
+    def __init__(self, directory, image_width, image_height):
+        os.makedirs(directory, exist_ok=True)
+        self.frames_count = 0
+        self.detections_count = 0
+        if os.path.exists(os.path.join(directory, "header.json")):
+            recording = Recording(directory)
+            if (recording.image_width, recording.image_height) != (image_width, image_height):
+                raise ValueError(f"Cannot append {image_width}x{image_height} frames to a {recording.image_width}x{recording.image_height} recording")
+            self.frames_count = len(recording)
+            self.detections_count = int(recording.frames[-1, 1]) if self.frames_count else 0
+            del recording # Releases the memory maps before the files are truncated
+        else:
+            with open(os.path.join(directory, "header.json"), "w") as header_file:
+                json.dump({"version": RECORDING_VERSION, "image_width": image_width, "image_height": image_height}, header_file)
+        self.detections_file = self._open(directory, "detections.bin", self.detections_count*6*8)
+        self.tips_midpoints_file = self._open(directory, "tips_midpoints.bin", self.frames_count*2*2*8)
+        self.frames_file = self._open(directory, "frames.bin", self.frames_count*len(FRAME_COLUMNS)*8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, detections, tips_midpoints):
+        """Records a frame: detections as passed to ObjectTracker.register_seen_detections, or None for a frame
+        on which the detector was skipped (ObjectTracker.predict_only)"""
+        if detections is not None:
+            detections = np.ascontiguousarray(detections, dtype="<f8").reshape(-1, 6)
+            self.detections_file.write(detections.tobytes())
+            self.detections_count += len(detections)
+        self.tips_midpoints_file.write(np.ascontiguousarray(tips_midpoints, dtype="<f8").reshape(2, 2).tobytes())
+        self.frames_file.write(np.array((self.frames_count, self.detections_count, detections is not None), dtype="<i8").tobytes())
+        self.frames_count += 1
+
+    def flush(self):
+        for recorded_file in (self.detections_file, self.tips_midpoints_file, self.frames_file):
+            recorded_file.flush()
+
+    def close(self):
+        for recorded_file in (self.detections_file, self.tips_midpoints_file, self.frames_file):
+            recorded_file.close()
+
+    def _open(self, directory, file_name, size):
+        """Opens a file for appending after its first size bytes, dropping the rest of an interrupted recording"""
+        recorded_file = open(os.path.join(directory, file_name), "ab")
+        recorded_file.truncate(size)
+        return recorded_file
+
+class Recording:
+    """Read-only view of a TrackerRecorder directory, with the files memory-mapped: frames, detections and
+    tips_midpoints are numpy arrays read from the page cache on demand, shared by all the processes replaying it"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "header.json")) as header_file:
+            header = json.load(header_file)
+        if header["version"] != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version {header['version']}")
+        self.image_width = header["image_width"]
+        self.image_height = header["image_height"]
+        frames = self._map("frames.bin", "<i8", (len(FRAME_COLUMNS),))
+        tips_midpoints = self._map("tips_midpoints.bin", "<f8", (2, 2))
+        detections = self._map("detections.bin", "<f8", (6,))
+        # Frames partially written when the recording was interrupted are ignored
+        frames_count = min(len(tips_midpoints), np.searchsorted(frames[:, 1], len(detections), side="right"))
+        self.frames = frames[:frames_count]
+        self.tips_midpoints = tips_midpoints[:frames_count]
+        self.detections = detections
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        """Returns (detections, tips_midpoints) of a frame, detections being None for a predict only frame"""
+        return self._get_frame(self.frames, self.detections, self.tips_midpoints, index, 0)
+
+    def __iter__(self):
+        """Iterates over the (detections, tips_midpoints) frames without copying them"""
+        for index in range(len(self)):
+            yield self[index]
+
+    def iter_chunks(self, chunk_frames):
+        """Iterates over the frames like __iter__, reading chunk_frames frames at a time into memory"""
+        for chunk_start in range(0, len(self), chunk_frames):
+            frames = np.array(self.frames[chunk_start:chunk_start + chunk_frames])
+            tips_midpoints = np.array(self.tips_midpoints[chunk_start:chunk_start + chunk_frames])
+            detections_start = int(self.frames[chunk_start - 1, 1]) if chunk_start else 0
+            detections = np.array(self.detections[detections_start:frames[-1, 1]])
+            for index in range(len(frames)):
+                yield self._get_frame(frames, detections, tips_midpoints, index, detections_start)
+
+    def _get_frame(self, frames, detections, tips_midpoints, index, detections_offset):
+        _, detections_end, has_detections = frames[index]
+        if not has_detections:
+            return None, tips_midpoints[index]
+        detections_start = int(frames[index - 1, 1]) if index else detections_offset
+        return detections[detections_start - detections_offset:detections_end - detections_offset], tips_midpoints[index]
+
+    def _map(self, file_name, dtype, row_shape):
+        file_path = os.path.join(self.directory, file_name)
+        row_size = np.dtype(dtype).itemsize*int(np.prod(row_shape))
+        rows_count = os.path.getsize(file_path)//row_size
+        if not rows_count:
+            return np.empty((0,) + row_shape, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=(rows_count,) + row_shape)
+
+def replay(recording, parameters=None, conf_threshold=0, chunk_frames=None, callback=None):
+    """Replays a Recording (or its directory) through a new ObjectTracker as fast as possible and returns the tracker.
+    parameters: dict of ObjectTracker class constants to use during the replay, e.g. {"IN_HAND_DISTANCE_PERCENTAGE_OF_WIDTH": 0.06}
+    chunk_frames: if given, the frames are read chunk_frames at a time into memory instead of straight from the memory map
+    callback: called with the tracker after each frame
+    The parameters are set on the ObjectTracker class during the replay, so they also apply to any other tracker of the
+    process: use replay_parallel, which replays in worker processes, next to live trackers"""
+    if not isinstance(recording, Recording):
+        recording = Recording(recording)
+    parameters = parameters or {}
+    default_parameters = {name: getattr(ObjectTracker, name) for name in parameters}
+    for name, value in parameters.items():
+        setattr(ObjectTracker, name, value)
+    try:
+        object_tracker = ObjectTracker(recording.image_width, recording.image_height)
+        for detections, tips_midpoints in (recording if chunk_frames is None else recording.iter_chunks(chunk_frames)):
+            if detections is None:
+                object_tracker.predict_only(tips_midpoints)
+            else:
+                object_tracker.register_seen_detections(detections, tips_midpoints, conf_threshold)
+                object_tracker.increment_frame_index()
+            if callback is not None:
+                callback(object_tracker)
+    finally:
+        for name, value in default_parameters.items():
+            setattr(ObjectTracker, name, value)
+    return object_tracker
+
+def get_replay_summary(object_tracker):
+    return {
+        "frame_index": object_tracker.frame_index,
+        "created_objects_count": object_tracker.next_object_tracker_id,
+        "tracked_objects_count": len(object_tracker.store),
+        "expired_objects_count": len(object_tracker.expired_archive),
+    }
+
+def replay_parallel(directory, parameter_sets, evaluate=get_replay_summary, conf_threshold=0, chunk_frames=None, processes=None):
+    """Replays the recording in directory once per dict of parameter_sets, in parallel worker processes that memory-map
+    the same files. Returns the results of evaluate (a picklable callable taking the final tracker) in the same order"""
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_replay_and_evaluate, directory, parameters, evaluate, conf_threshold, chunk_frames) for parameters in parameter_sets]
+        return [future.result() for future in futures]
+
+def _replay_and_evaluate(directory, parameters, evaluate, conf_threshold, chunk_frames):
+    return evaluate(replay(directory, parameters, conf_threshold, chunk_frames))
@@ -3,7 +3,7 @@ from setuptools import setup
 setup(
     name="yolo-mp-object-tracker",
     version="0.1",
-    py_modules=["object_tracker", "tracked_object", "yolo_object", "hand_helper"],
+    py_modules=["object_tracker", "multi_stream_tracker", "pipeline", "async_tracker", "instrumentation", "recording", "tracker_events", "snapshot", "association", "expired_archive", "spatial_grid", "track_store", "tracked_object", "yolo_object", "hand_helper"],
     install_requires=[
         "numpy"
     ],
@@ -17,5 +17,5 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.8",
 )
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import numpy as np
+
+from expired_archive import ExpiredObject
+from object_tracker import ObjectTracker
+
+SNAPSHOT_VERSION = 1
+# Scalar fields of the state, stored as 0-d int64 arrays
+SCALAR_FIELDS = ("image_width", "image_height", "frame_index", "next_object_tracker_id") + ObjectTracker.THRESHOLD_NAMES
+# Columns of the expired objects, bbox being (n, 4)
+EXPIRED_COLUMNS = (("tracker_id", "<i8"), ("label_id", "<i8"), ("conf", "<f8"), ("bbox", "<f8"), ("last_seen_frame_index", "<i8"),
+                   ("frames_persistence", "<i8"), ("in_hand_frames_persistence", "<i8"), ("last_revival_frame_index", "<i8"),
+                   ("expired_frame_index", "<i8"))
+
+def write_snapshot(state, file):
+    """Writes a state returned by ObjectTracker.get_state to file (a path or a binary file object), as an uncompressed
+    .npz archive of little-endian column arrays"""
+    arrays = {"snapshot_version": np.array(SNAPSHOT_VERSION, dtype="<i8")}
+    arrays.update({name: np.array(state[name], dtype="<i8") for name in SCALAR_FIELDS})
+    arrays["hand_tracker_ids"] = np.asarray(state["hand_tracker_ids"], dtype="<i8")
+    arrays["previous_tips_midpoints"] = np.asarray(state["previous_tips_midpoints"], dtype="<f8")
+    arrays.update({name: value for name, value in state.items() if name.startswith("store_")})
+    expired_objects = state["expired_objects"]
+    for i, (name, dtype) in enumerate(EXPIRED_COLUMNS):
+        column = np.array([expired_object[i] for expired_object in expired_objects], dtype=dtype)
+        arrays[f"expired_{name}"] = column.reshape(-1, 4) if name == "bbox" else column
+    np.savez(file, **arrays)
+
+def read_snapshot(file):
+    """Reads a state written by write_snapshot, to be passed to ObjectTracker.from_state"""
+    with np.load(file) as arrays:
+        if int(arrays["snapshot_version"]) != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {int(arrays['snapshot_version'])}")
+        state = {name: int(arrays[name]) for name in SCALAR_FIELDS}
+        state.update({name: arrays[name] for name in arrays.files if name.startswith("store_")})
+        state["hand_tracker_ids"] = arrays["hand_tracker_ids"]
+        state["previous_tips_midpoints"] = arrays["previous_tips_midpoints"]
+        expired_columns = [arrays[f"expired_{name}"].tolist() for name, _ in EXPIRED_COLUMNS]
+    expired_columns[3] = map(tuple, expired_columns[3])
+    state["expired_objects"] = [ExpiredObject(*values) for values in zip(*expired_columns)]
+    return state
+
+def save_snapshot(object_tracker, file):
+    write_snapshot(object_tracker.get_state(), file)
+
+def load_snapshot(file):
+    """Returns a new ObjectTracker restored from a snapshot file"""
+    return ObjectTracker.from_state(read_snapshot(file))
+
+class SnapshotWriter:
+    """Tracker subscriber writing a snapshot of the tracker to file_path every every_frames frames, enabled with
+    object_tracker.subscribe(SnapshotWriter(object_tracker, "tracker.npz")).
+    The tracking thread only copies the state, the snapshot is encoded and written by a background thread to a temporary
+    file that atomically replaces file_path, so that a reader always finds a complete snapshot. If a write is still in
+    progress when the next state is copied, only the latest state is kept"""
+
+    def __init__(self, object_tracker, file_path, every_frames=30):
+        self.object_tracker = object_tracker
+        self.file_path = file_path
+        self.every_frames = every_frames
+        self.snapshots_count = 0
+        self.last_frame_index = None
+        self._pending_state = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._write_snapshots, daemon=True)
+        self._thread.start()
+
+    def __call__(self, events):
+        if self.object_tracker.frame_index % self.every_frames == 0:
+            self.submit()
+
+    def submit(self):
+        """Copies the current state of the tracker, to be written by the background thread"""
+        state = self.object_tracker.get_state()
+        with self._condition:
+            self._pending_state = state
+            self._condition.notify()
+
+    def close(self):
+        """Writes the pending state, if any, and stops the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _write_snapshots(self):
+        temporary_file_path = f"{self.file_path}.tmp"
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending_state is not None or self._closed)
+                state, self._pending_state = self._pending_state, None
+            if state is None:
+                return
+            with open(temporary_file_path, "wb") as snapshot_file:
+                write_snapshot(state, snapshot_file)
+            os.replace(temporary_file_path, self.file_path)
+            self.snapshots_count += 1
+            self.last_frame_index = state["frame_index"]
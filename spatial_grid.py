@@ -0,0 +1,66 @@
+import numpy as np
+
+from association import get_range_pairs
+
+CELL_COORDINATE_BIAS = 1 << 20
+CELLS_PER_ROW = 1 << 21
+STREAM_KEY_STRIDE = CELLS_PER_ROW*CELLS_PER_ROW
+
+def get_neighbor_pairs(query_keys, sorted_keys, sorted_rows, reach):
+    """Returns the query indices and the rows of all the (query, row) pairs whose cells are at most reach cells apart
+    on both axes. sorted_keys are the cell keys of the rows, sorted, and sorted_rows the rows in the same order"""
+    cell_offsets = np.arange(-reach, reach + 1)
+    key_offsets = (cell_offsets[:, np.newaxis]*CELLS_PER_ROW + cell_offsets[np.newaxis, :]).ravel()
+    neighbor_keys = (query_keys[:, np.newaxis] + key_offsets[np.newaxis, :]).ravel()
+    neighbor_indices, positions = get_range_pairs(neighbor_keys, sorted_keys)
+    return neighbor_indices // len(key_offsets), sorted_rows[positions]
+
+class SpatialGrid:
+    """Uniform grid index over the centers of the rows of a TrackStore, used for all the radius queries of the tracker.
+    The rows are kept sorted by cell key and the index is updated incrementally: only the rows changing cell are moved"""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.sorted_keys = np.empty(0, dtype=np.int64)
+        self.sorted_rows = np.empty(0, dtype=np.intp)
+
+    def get_cell_keys(self, centers):
+        cells = np.floor(centers/self.cell_size).astype(np.int64) + CELL_COORDINATE_BIAS
+        return cells[..., 1]*CELLS_PER_ROW + cells[..., 0]
+
+    def get_reach(self, radius_squared):
+        """Returns the number of neighbor cells to visit on each side to find all the centers within the radius"""
+        return int(np.ceil(np.sqrt(radius_squared)/self.cell_size))
+
+    def insert(self, rows, keys):
+        order = np.argsort(keys, kind="stable")
+        positions = np.searchsorted(self.sorted_keys, keys[order], side="right")
+        self.sorted_keys = np.insert(self.sorted_keys, positions, keys[order])
+        self.sorted_rows = np.insert(self.sorted_rows, positions, rows[order])
+
+    def remove(self, rows):
+        kept = ~np.isin(self.sorted_rows, rows)
+        self.sorted_keys = self.sorted_keys[kept]
+        self.sorted_rows = self.sorted_rows[kept]
+
+    def move(self, rows, old_keys, new_keys):
+        changed = old_keys != new_keys
+        if np.any(changed):
+            self.remove(rows[changed])
+            self.insert(rows[changed], new_keys[changed])
+
+    def renumber(self, new_rows):
+        """Applies a compaction of the store: new_rows maps each old row to its new row, or to -1 if removed"""
+        sorted_rows = new_rows[self.sorted_rows]
+        kept = sorted_rows >= 0
+        self.sorted_keys = self.sorted_keys[kept]
+        self.sorted_rows = sorted_rows[kept]
+
+    def rebuild(self, keys):
+        self.sorted_rows = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.sorted_rows]
+
+    def query(self, centers, radius_squared):
+        """Returns the query indices and the rows of the candidate (center, row) pairs for a radius query.
+        All the rows within the radius of each center are included, along with some farther ones in the neighbor cells"""
+        return get_neighbor_pairs(self.get_cell_keys(centers), self.sorted_keys, self.sorted_rows, self.get_reach(radius_squared))
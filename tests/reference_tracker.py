@@ -0,0 +1,185 @@
+"""Loop-based reference of ObjectTracker for the tests: the original list-of-objects tracker, with the visible objects
+matched from the closest (detection, tracked object) pair, as documented for ObjectTracker, instead of in detection order"""
+import numpy as np
+
+class ReferenceTrackedObject:
+    def __init__(self, yolo_object, tracker_id, frame_index):
+        self.yolo_object = yolo_object
+        self.tracker_id = tracker_id
+        self.last_seen_frame_index = frame_index
+        self.frames_persistence = 1
+        self.in_hand_frames_persistence = 0
+        self.is_visible = True
+        self.is_moving = False
+
+class ReferenceObjectTracker:
+    TRACKING_DISTANCE_PERCENTAGE_OF_WIDTH = 0.08
+    MOVING_DISTANCE_PERCENTAGE_OF_WIDTH = 0.01
+    IN_HAND_DISTANCE_PERCENTAGE_OF_WIDTH = 0.05
+    BACK_TO_TRACK_DISTANCE_PERCENTAGE_OF_WIDTH = 0.15
+
+    FALSE_SEEN_FRAMES_PATIENCE = 5
+    EXPIRATION_FRAMES_PATIENCE = 20
+    PATIENT_COEFFICIENT_NOT_SEEN_IN_HAND = 2
+    STABLE_IN_HAND_FRAMES_PATIENCE = 5
+
+    def __init__(self, image_width, image_height):
+        self.image_width = image_width
+        self.image_height = image_height
+        self.tracked_objects = []
+        self.expired_objects = []
+        self.frame_index = 0
+        self.next_object_tracker_id = 0
+        self.hand_tracked_objects = [None, None]
+
+        self.tracking_distance_threshold = int(self.TRACKING_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
+        self.moving_distance_threshold = int(self.MOVING_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
+        self.in_hand_distance_threshold = int(self.IN_HAND_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
+        self.back_to_track_distance_threshold = int(self.BACK_TO_TRACK_DISTANCE_PERCENTAGE_OF_WIDTH*self.image_width)**2
+
+    def register_seen_objects(self, seen_yolo_objects, tips_midpoints):
+        yolo_objects_to_track = list(seen_yolo_objects)
+        already_tracked_object_ids = []
+
+        # Visible objects logic, from the closest pair
+        pairs = []
+        for i, yolo_object in enumerate(yolo_objects_to_track):
+            for j, tracked_object in enumerate(self.tracked_objects):
+                if tracked_object.yolo_object.label_id == yolo_object.label_id:
+                    distance = self._get_distance(yolo_object.get_center(), tracked_object.yolo_object.get_center())
+                    if distance < self.tracking_distance_threshold:
+                        pairs.append((distance, i, j))
+        matches = {}
+        matched_tracks = set()
+        for distance, i, j in sorted(pairs):
+            if i not in matches and j not in matched_tracks:
+                matches[i] = (j, distance)
+                matched_tracks.add(j)
+
+        visible_tracked_objects = []
+        visible_hands_distances = []
+        visible_closest_hands = []
+        for i in sorted(matches):
+            j, distance = matches[i]
+            tracked_object = self.tracked_objects[j]
+            tracked_object.yolo_object = yolo_objects_to_track[i]
+            tracked_object.last_seen_frame_index = self.frame_index
+            if tracked_object.frames_persistence < self.FALSE_SEEN_FRAMES_PATIENCE:
+                tracked_object.frames_persistence += 1
+            tracked_object.is_visible = True
+            tracked_object.is_moving = distance >= self.moving_distance_threshold
+            visible_tracked_objects.append(tracked_object)
+            hands_distance, closest_hand = self._get_closest_hand(tips_midpoints, tracked_object)
+            visible_hands_distances.append(hands_distance)
+            visible_closest_hands.append(closest_hand)
+            already_tracked_object_ids.append(tracked_object.tracker_id)
+        yolo_objects_to_track = [yolo_object for i, yolo_object in enumerate(yolo_objects_to_track) if i not in matches]
+
+        # Hand association
+        for hand_index in range(2):
+            for i in np.argsort(visible_hands_distances, kind="stable"):
+                if visible_hands_distances[i] >= self.in_hand_distance_threshold:
+                    break
+                if visible_closest_hands[i] == hand_index:
+                    tracked_object = visible_tracked_objects[i]
+                    hand_tracked_object = self.hand_tracked_objects[hand_index]
+                    if hand_tracked_object is not None and hand_tracked_object.tracker_id == tracked_object.tracker_id: # Object already in the hand
+                        if hand_tracked_object.in_hand_frames_persistence < self.STABLE_IN_HAND_FRAMES_PATIENCE:
+                            hand_tracked_object.in_hand_frames_persistence += 1
+                        break
+                    elif hand_tracked_object is None or hand_tracked_object.in_hand_frames_persistence < self.STABLE_IN_HAND_FRAMES_PATIENCE: # New object in the hand
+                        self.hand_tracked_objects[hand_index] = tracked_object
+                        tracked_object.in_hand_frames_persistence = 1
+                        break
+
+        # Back to track from hand hide logic or create a new tracked object
+        for yolo_object in yolo_objects_to_track:
+            back_to_track_tracked_object = None
+            for hand_index in range(2):
+                hand_tracked_object = self.hand_tracked_objects[hand_index]
+                if hand_tracked_object is not None \
+                   and not hand_tracked_object.is_visible \
+                   and (not any(tips_midpoints[hand_index]) or self._get_distance(tips_midpoints[hand_index], yolo_object.get_center()) < self.back_to_track_distance_threshold) \
+                   and hand_tracked_object.yolo_object.label_id == yolo_object.label_id:
+                    back_to_track_tracked_object = hand_tracked_object
+                    break
+
+            if back_to_track_tracked_object is not None:
+                back_to_track_tracked_object.yolo_object = yolo_object
+                back_to_track_tracked_object.last_seen_frame_index = self.frame_index
+                if back_to_track_tracked_object.frames_persistence < self.FALSE_SEEN_FRAMES_PATIENCE:
+                    back_to_track_tracked_object.frames_persistence += 1
+                back_to_track_tracked_object.is_visible = True
+                back_to_track_tracked_object.is_moving = True
+                already_tracked_object_ids.append(back_to_track_tracked_object.tracker_id)
+            elif not any(tracked_object.tracker_id in already_tracked_object_ids \
+                         and tracked_object.yolo_object.label_id == yolo_object.label_id \
+                         and tracked_object.frames_persistence >= self.FALSE_SEEN_FRAMES_PATIENCE \
+                         and self._get_distance(tracked_object.yolo_object.get_center(), yolo_object.get_center()) < self.tracking_distance_threshold \
+                         for tracked_object in self.tracked_objects): # Not a double detection of a confirmed object
+                tracked_object = ReferenceTrackedObject(yolo_object, self.next_object_tracker_id, self.frame_index)
+                self.next_object_tracker_id += 1
+                self.tracked_objects.append(tracked_object)
+                already_tracked_object_ids.append(tracked_object.tracker_id)
+
+        # Hidden objects logic (possible hidden from hand track logic)
+        hidden_objects = []
+        hidden_hands_distances = []
+        hidden_closest_hands = []
+        for tracked_object in self.tracked_objects:
+            if tracked_object.tracker_id not in already_tracked_object_ids:
+                tracked_object.is_visible = False
+                tracked_object.is_moving = True
+                hidden_objects.append(tracked_object)
+                hands_distance, closest_hand = self._get_closest_hand(tips_midpoints, tracked_object)
+                hidden_hands_distances.append(hands_distance)
+                hidden_closest_hands.append(closest_hand)
+
+        for hand_index in range(2):
+            hand_tracked_object = self.hand_tracked_objects[hand_index]
+            if hand_tracked_object is None or hand_tracked_object.in_hand_frames_persistence < self.STABLE_IN_HAND_FRAMES_PATIENCE:
+                for i in np.argsort(hidden_hands_distances, kind="stable"):
+                    if hidden_hands_distances[i] >= self.in_hand_distance_threshold:
+                        break
+                    if hidden_closest_hands[i] == hand_index:
+                        self.hand_tracked_objects[hand_index] = hidden_objects[i]
+                        if hidden_objects[i].in_hand_frames_persistence < self.STABLE_IN_HAND_FRAMES_PATIENCE:
+                            hidden_objects[i].in_hand_frames_persistence += 1
+                        break
+
+        # Hand release logic
+        for hand_index in range(2):
+            hand_tracked_object = self.hand_tracked_objects[hand_index]
+            if any(tips_midpoints[hand_index]) \
+               and hand_tracked_object is not None \
+               and hand_tracked_object.is_visible \
+               and self._get_distance(tips_midpoints[hand_index], hand_tracked_object.yolo_object.get_center()) >= self.in_hand_distance_threshold:
+                hand_tracked_object.in_hand_frames_persistence = 0
+                self.hand_tracked_objects[hand_index] = None
+
+    def increment_frame_index(self):
+        self.tracked_objects = [tracked_object for tracked_object in self.tracked_objects \
+                                if tracked_object.is_visible or tracked_object.frames_persistence >= self.FALSE_SEEN_FRAMES_PATIENCE]
+        kept_objects = []
+        for tracked_object in self.tracked_objects:
+            patience = self.EXPIRATION_FRAMES_PATIENCE
+            if any(hand_tracked_object is tracked_object for hand_tracked_object in self.hand_tracked_objects):
+                patience *= self.PATIENT_COEFFICIENT_NOT_SEEN_IN_HAND
+            if tracked_object.last_seen_frame_index < self.frame_index - patience:
+                self.expired_objects.append(tracked_object)
+            else:
+                kept_objects.append(tracked_object)
+        self.tracked_objects = kept_objects
+        for hand_index in range(2):
+            if self.hand_tracked_objects[hand_index] is not None and self.hand_tracked_objects[hand_index] not in self.tracked_objects:
+                self.hand_tracked_objects[hand_index] = None
+        self.frame_index += 1
+
+    def _get_closest_hand(self, tips_midpoints, tracked_object):
+        """Returns the squared distance to the closest hand and its index, the right hand being preferred on ties"""
+        hands_distances = [self._get_distance(tips_midpoint, tracked_object.yolo_object.get_center()) for tips_midpoint in tips_midpoints]
+        closest_hand = 0 if hands_distances[0] <= hands_distances[1] else 1
+        return hands_distances[closest_hand], closest_hand
+
+    def _get_distance(self, center_1, center_2):
+        return (center_1[0] - center_2[0])**2 + (center_1[1] - center_2[1])**2
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from association import assign
+from object_tracker import ObjectTracker
+
+def assign_with_loop(candidate_detection_indices, candidate_track_indices, detection_centers, track_centers, distance_threshold):
+    """Reference of assign(): walks the gated pairs from the closest one, ties resolved by detection then track order"""
+    pairs = []
+    for detection_index, track_index in zip(candidate_detection_indices.tolist(), candidate_track_indices.tolist()):
+        distance = float(np.sum((detection_centers[detection_index] - track_centers[track_index])**2))
+        threshold = distance_threshold[detection_index] if np.ndim(distance_threshold) else distance_threshold
+        if distance < threshold:
+            pairs.append((distance, detection_index, track_index))
+    matches = []
+    assigned_detections = set()
+    assigned_tracks = set()
+    for distance, detection_index, track_index in sorted(pairs):
+        if detection_index not in assigned_detections and track_index not in assigned_tracks:
+            matches.append((detection_index, track_index, distance))
+            assigned_detections.add(detection_index)
+            assigned_tracks.add(track_index)
+    return sorted(matches)
+
+def test_assign_matches_greedy_loop():
+    rng = np.random.default_rng(0)
+    for case in range(200):
+        detections_count = int(rng.integers(0, 30))
+        tracks_count = int(rng.integers(0, 30))
+        # Small integer coordinates, so that many pairs are at equal distances
+        detection_centers = rng.integers(0, 20, (detections_count, 2)).astype(np.float64)
+        track_centers = rng.integers(0, 20, (tracks_count, 2)).astype(np.float64)
+        all_pairs = np.array([(i, j) for i in range(detections_count) for j in range(tracks_count)], dtype=np.int64).reshape(-1, 2)
+        candidates = all_pairs[rng.random(len(all_pairs)) < 0.5]
+        distance_threshold = rng.integers(1, 200, detections_count) if case % 2 else 50
+        expected = assign_with_loop(candidates[:, 0], candidates[:, 1], detection_centers, track_centers, distance_threshold)
+        detection_indices, track_indices, distances = assign(candidates[:, 0], candidates[:, 1], detection_centers, track_centers, distance_threshold)
+        assert list(zip(detection_indices.tolist(), track_indices.tolist(), distances.tolist())) == expected
+
+def test_register_seen_detections_matches_nearest_track_loop():
+    """On separated objects, each detection goes to the closest unassigned tracked object with the same label, as in the
+    original loop over the tracked objects"""
+    rng = np.random.default_rng(1)
+    image_width, image_height = 640, 480
+    centers = np.stack(np.meshgrid(np.arange(60, 640, 100), np.arange(60, 480, 100)), axis=-1).reshape(-1, 2).astype(np.float64)
+    labels = rng.integers(0, 3, len(centers))
+    object_tracker = ObjectTracker(image_width, image_height)
+    for frame_index in range(200):
+        centers += rng.integers(-3, 4, centers.shape)
+        is_detected = rng.random(len(centers)) >= 0.1
+        detections = np.column_stack((labels, np.full(len(centers), 0.9), centers - 10, centers + 10))[is_detected]
+        detections = detections[rng.permutation(len(detections))]
+
+        expected_tracker_ids = []
+        assigned_tracker_ids = set()
+        for label_id, _, x1, y1, x2, y2 in detections.tolist():
+            center = np.floor_divide((x1 + x2, y1 + y2), 2)
+            near_objects = [(float(np.sum((center - tracked_object.yolo_object.get_center())**2)), tracked_object.tracker_id) \
+                            for tracked_object in object_tracker.tracked_objects \
+                            if tracked_object.tracker_id not in assigned_tracker_ids and tracked_object.yolo_object.label_id == label_id]
+            distance, tracker_id = min(near_objects, default=(None, None))
+            if distance is None or distance >= object_tracker.tracking_distance_threshold:
+                tracker_id = None
+            expected_tracker_ids.append(tracker_id)
+            assigned_tracker_ids.add(tracker_id)
+
+        next_object_tracker_id = object_tracker.next_object_tracker_id
+        object_tracker.register_seen_detections(detections, np.zeros((2, 2)))
+        tracked_objects_by_box = {(tracked_object.yolo_object.x1, tracked_object.yolo_object.y1, tracked_object.yolo_object.x2, tracked_object.yolo_object.y2): tracked_object \
+                                  for tracked_object in object_tracker.tracked_objects}
+        for detection, expected_tracker_id in zip(detections.tolist(), expected_tracker_ids):
+            tracked_object = tracked_objects_by_box[tuple(detection[2:])]
+            if expected_tracker_id is None:
+                assert tracked_object.tracker_id >= next_object_tracker_id
+            else:
+                assert tracked_object.tracker_id == expected_tracker_id
+        object_tracker.increment_frame_index()
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expired_archive import ExpiredArchive
+from object_tracker import ObjectTracker
+
+def get_removed(tracker_ids, label_ids=None, bboxes=None, last_revival_frame_indices=None):
+    """Returns the TrackStore columns of removed rows, as passed to ExpiredArchive.add"""
+    count = len(tracker_ids)
+    return {
+        "tracker_id": np.array(tracker_ids, dtype=np.int64),
+        "label_id": np.array(label_ids if label_ids is not None else [0]*count, dtype=np.int64),
+        "conf": np.full(count, 0.9),
+        "bbox": np.array(bboxes if bboxes is not None else [(0, 0, 10, 10)]*count, dtype=np.float64).reshape(-1, 4),
+        "last_seen_frame_index": np.zeros(count, dtype=np.int64),
+        "frames_persistence": np.full(count, 5, dtype=np.int64),
+        "in_hand_frames_persistence": np.zeros(count, dtype=np.int64),
+        "last_revival_frame_index": np.array(last_revival_frame_indices if last_revival_frame_indices is not None else [-1]*count, dtype=np.int64),
+    }
+
+def get_tracker_ids(expired_archive):
+    return [expired_object.tracker_id for expired_object in expired_archive]
+
+def track_until_expired(object_tracker, detections):
+    for _ in range(ObjectTracker.FALSE_SEEN_FRAMES_PATIENCE + 1):
+        object_tracker.register_seen_detections(detections, np.zeros((2, 2)))
+        object_tracker.increment_frame_index()
+    while len(object_tracker.store):
+        object_tracker.register_seen_detections(np.empty((0, 6)), np.zeros((2, 2)))
+        object_tracker.increment_frame_index()
+
+def test_fifo_eviction():
+    expired_archive = ExpiredArchive(max_count=2)
+    for frame_index, tracker_id in enumerate((3, 1, 2)):
+        expired_archive.add(get_removed([tracker_id]), frame_index)
+    assert get_tracker_ids(expired_archive) == [1, 2]
+
+def test_lru_eviction():
+    expired_archive = ExpiredArchive(max_count=2, eviction_policy="lru")
+    expired_archive.add(get_removed([0, 1, 2], last_revival_frame_indices=[8, 3, 5]), 10)
+    assert get_tracker_ids(expired_archive) == [0, 2]
+    expired_archive.pop(2)
+    expired_archive.add(get_removed([2, 3], last_revival_frame_indices=[11, 12]), 12)
+    assert get_tracker_ids(expired_archive) == [2, 3]
+
+def test_max_age_eviction():
+    expired_archive = ExpiredArchive(max_age=10)
+    expired_archive.add(get_removed([0]), 0)
+    expired_archive.add(get_removed([1]), 5)
+    expired_archive.evict(10)
+    assert get_tracker_ids(expired_archive) == [0, 1]
+    expired_archive.evict(11)
+    assert get_tracker_ids(expired_archive) == [1]
+    expired_archive.evict(16)
+    assert not len(expired_archive)
+
+def test_find_nearest():
+    expired_archive = ExpiredArchive(cell_size=20)
+    expired_archive.add(get_removed([0, 1, 2, 3], label_ids=[0, 0, 1, 0],
+                                    bboxes=[(80, 90, 100, 110), (130, 90, 150, 110), (115, 95, 125, 105), (300, 300, 310, 310)]), 0)
+    assert expired_archive.find_nearest(0, (120, 100), 50**2).tracker_id == 1 # 20 pixels away, across a cell border
+    assert expired_archive.find_nearest(1, (120, 100), 50**2).tracker_id == 2
+    assert expired_archive.find_nearest(0, (120, 100), 20**2) is None # The threshold is exclusive
+    assert expired_archive.find_nearest(2, (120, 100), 50**2) is None
+    expired_archive.pop(1)
+    assert expired_archive.find_nearest(0, (120, 100), 50**2).tracker_id == 0
+
+def test_force_object_in_hand_revives_expired_object_instance():
+    object_tracker = ObjectTracker(640, 480)
+    track_until_expired(object_tracker, np.array([[1, 0.9, 100, 100, 140, 140]]))
+    assert object_tracker.expired_objects[0] is object_tracker.expired_objects[0]
+    expired_object = object_tracker.expired_objects[0]
+    object_tracker.force_object_in_hand(0, expired_object)
+    assert object_tracker.right_hand_tracked_object is expired_object
+    assert expired_object.last_seen_frame_index == object_tracker.frame_index
+    assert expired_object.in_hand_frames_persistence == ObjectTracker.STABLE_IN_HAND_FRAMES_PATIENCE
+    assert not object_tracker.expired_objects
+
+def test_revived_object_keeps_its_tracked_object_instance(monkeypatch):
+    monkeypatch.setattr(ObjectTracker, "REVIVE_EXPIRED_OBJECTS", True)
+    object_tracker = ObjectTracker(640, 480)
+    detections = np.array([[1, 0.9, 100, 100, 140, 140]])
+    object_tracker.register_seen_detections(detections, np.zeros((2, 2)))
+    tracked_object = object_tracker.tracked_objects[0]
+    track_until_expired(object_tracker, detections)
+    assert object_tracker.expired_objects == [tracked_object]
+    object_tracker.register_seen_detections(detections + (0, 0, 5, 5, 5, 5), np.zeros((2, 2)))
+    assert object_tracker.tracked_objects == [tracked_object]
+    assert tracked_object.last_seen_frame_index == object_tracker.frame_index
+    assert tracked_object.yolo_object.x1 == 105
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from multi_stream_tracker import MultiStreamTracker
+from object_tracker import ObjectTracker
+from synthetic_scene import SyntheticScene
+
+IMAGE_SIZES = ((1280, 720), (640, 480), (1920, 1080))
+
+def get_state(object_tracker):
+    store = object_tracker.store
+    return (
+        {name: getattr(store, name)[:store.size].tolist() for name in store.STATE_COLUMNS},
+        list(object_tracker.hand_tracker_ids),
+        list(object_tracker.expired_archive),
+        object_tracker.next_object_tracker_id,
+        object_tracker.frame_index,
+    )
+
+@pytest.mark.parametrize("motion_prediction", (False, True))
+def test_multi_stream_tracker_matches_separate_trackers(monkeypatch, motion_prediction):
+    monkeypatch.setattr(ObjectTracker, "MOTION_PREDICTION", motion_prediction)
+    scenes = [SyntheticScene(40, 3, image_width, image_height, seed=stream_index).iter_frames(300) \
+              for stream_index, (image_width, image_height) in enumerate(IMAGE_SIZES)]
+    multi_stream_tracker = MultiStreamTracker(IMAGE_SIZES)
+    object_trackers = [ObjectTracker(image_width, image_height) for image_width, image_height in IMAGE_SIZES]
+    for frame_index, frames in enumerate(zip(*scenes)):
+        detections = [stream_detections for stream_detections, _ in frames]
+        tips_midpoints = np.array([stream_tips_midpoints for _, stream_tips_midpoints in frames])
+        if motion_prediction and frame_index % 3:
+            multi_stream_tracker.predict_only(tips_midpoints)
+            for object_tracker, stream_tips_midpoints in zip(object_trackers, tips_midpoints):
+                object_tracker.predict_only(stream_tips_midpoints)
+        else:
+            multi_stream_tracker.register_seen_detections(detections, tips_midpoints, conf_threshold=0.5)
+            multi_stream_tracker.increment_frame_index()
+            for object_tracker, stream_detections, stream_tips_midpoints in zip(object_trackers, detections, tips_midpoints):
+                object_tracker.register_seen_detections(stream_detections, stream_tips_midpoints, conf_threshold=0.5)
+                object_tracker.increment_frame_index()
+        for stream_index, object_tracker in enumerate(object_trackers):
+            assert get_state(multi_stream_tracker[stream_index]) == get_state(object_tracker)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from object_tracker import ObjectTracker
+from reference_tracker import ReferenceObjectTracker
+from synthetic_scene import SyntheticScene
+from yolo_object import YoloObject
+
+def get_tracked_state(tracked_objects):
+    return sorted((tracked_object.tracker_id, tracked_object.yolo_object.label_id, tracked_object.yolo_object.x1, tracked_object.yolo_object.y1,
+                   tracked_object.yolo_object.x2, tracked_object.yolo_object.y2, tracked_object.last_seen_frame_index, tracked_object.frames_persistence,
+                   tracked_object.in_hand_frames_persistence, bool(tracked_object.is_visible), bool(tracked_object.is_moving)) \
+                  for tracked_object in tracked_objects)
+
+def get_tracker_id(tracked_object):
+    return None if tracked_object is None else tracked_object.tracker_id
+
+@pytest.mark.parametrize("objects_count, seed", [(80, seed) for seed in range(4)] + [(150, seed) for seed in range(4, 6)])
+def test_object_tracker_matches_reference_loop_with_hands(objects_count, seed):
+    scene = SyntheticScene(objects_count, 3, 1280, 720, seed=seed, duplicate_probability=0, false_positives_rate=0)
+    object_tracker = ObjectTracker(1280, 720)
+    reference_tracker = ReferenceObjectTracker(1280, 720)
+    held_frames_count = 0
+    for detections, tips_midpoints in scene.iter_frames(300):
+        object_tracker.register_seen_detections(detections, tips_midpoints)
+        object_tracker.increment_frame_index()
+        reference_tracker.register_seen_objects([YoloObject.from_np_array(detection) for detection in detections], tips_midpoints.tolist())
+        reference_tracker.increment_frame_index()
+
+        assert get_tracked_state(object_tracker.tracked_objects) == get_tracked_state(reference_tracker.tracked_objects)
+        hand_tracker_ids = [get_tracker_id(object_tracker.right_hand_tracked_object), get_tracker_id(object_tracker.left_hand_tracked_object)]
+        assert hand_tracker_ids == [get_tracker_id(hand_tracked_object) for hand_tracked_object in reference_tracker.hand_tracked_objects]
+        assert sorted(expired_object.tracker_id for expired_object in object_tracker.expired_archive) == \
+               sorted(expired_object.tracker_id for expired_object in reference_tracker.expired_objects)
+        held_frames_count += any(tracker_id is not None for tracker_id in hand_tracker_ids)
+    assert held_frames_count # The scene exercises the hand logic
@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from object_tracker import ObjectTracker
+from pipeline import RESULT_COLUMNS, SharedRingBuffer, _run_frame_worker, _run_tracker_worker, get_result_rows
+from synthetic_scene import SyntheticScene
+
+@pytest.fixture
+def rings():
+    """Creates SharedRingBuffer instances, unlinked at the end of the test"""
+    created_rings = []
+    def create_ring(*args, **kwargs):
+        ring = SharedRingBuffer(*args, **kwargs)
+        created_rings.append(ring)
+        return ring
+    yield create_ring
+    for ring in created_rings:
+        ring.release(unlink=True)
+
+def read_all(ring, cursor=0):
+    items = []
+    while True:
+        frame_index, rows, cursor = ring.read(cursor)
+        if frame_index is None:
+            return items
+        items.append((frame_index, rows))
+
+def test_ring_buffer_drops_oldest_items(rings):
+    ring = rings(3, 2, row_shape=(2,))
+    for frame_index in range(5):
+        ring.write(frame_index, np.full((frame_index % 3, 2), frame_index))
+    assert ring.write_count == 5
+    items = read_all(ring)
+    assert [frame_index for frame_index, _ in items] == [2, 3, 4]
+    for frame_index, rows in items:
+        assert rows.shape == (frame_index % 3, 2) and np.all(rows == frame_index)
+    with pytest.raises(ValueError):
+        ring.write(5, np.zeros((3, 2)))
+
+def test_ring_buffer_is_shared_between_instances(rings):
+    ring = rings(4, 1)
+    reader_ring = SharedRingBuffer(*ring.__getstate__()[:4], name=ring.shared_memory.name)
+    try:
+        ring.write(7, [1.5])
+        ring.close_writing()
+        assert reader_ring.is_closed
+        frame_index, rows, cursor = reader_ring.read(0)
+        assert (frame_index, rows.tolist(), cursor) == (7, [1.5], 1)
+    finally:
+        reader_ring.release()
+
+def test_ring_buffer_skips_slot_being_written(rings):
+    ring = rings(4, 1)
+    for frame_index in range(3):
+        ring.write(frame_index, [frame_index])
+    ring.slot_headers[1, 0] += 1 # Odd version, as while the writer fills the slot
+    assert [frame_index for frame_index, _ in read_all(ring)] == [0, 2]
+    ring.slot_headers[1, 0] += 1
+    assert [frame_index for frame_index, _ in read_all(ring)] == [0, 1, 2]
+
+def test_frame_worker_keeps_most_confident_rows(rings):
+    frames_ring = rings(4, 1, row_shape=(1,))
+    output_ring = rings(4, 2, row_shape=(6,))
+    for frame_index in range(3):
+        frames_ring.write(frame_index, [[frame_index]])
+    frames_ring.close_writing()
+    detect = lambda frame: np.array([[0, 0.2, 0, 0, 1, 1], [1, 0.9, 0, 0, 1, 1], [2, 0.5 + frame[0]/10, 0, 0, 1, 1]])
+    _run_frame_worker(detect, frames_ring, output_ring, poll_interval=0, conf_column=1)
+    assert output_ring.is_closed
+    assert [(frame_index, rows[:, 0].tolist()) for frame_index, rows in read_all(output_ring)] == [(0, [1, 2]), (1, [1, 2]), (2, [1, 2])]
+
+def test_frame_worker_closes_output_ring_on_failure(rings):
+    frames_ring = rings(4, 1, row_shape=(1,))
+    output_ring = rings(4, 1)
+    frames_ring.write(0, [[0]])
+    with pytest.raises(ZeroDivisionError):
+        _run_frame_worker(lambda frame: 1/0, frames_ring, output_ring, poll_interval=0)
+    assert output_ring.is_closed
+
+def test_tracker_worker_tracks_frames_in_order(rings):
+    frames_count = 60
+    scene_frames = list(SyntheticScene(20, 3, 640, 480, seed=0).iter_frames(frames_count))
+    assert max(len(detections) for detections, _ in scene_frames) <= 64 # No row dropped by the detections worker
+    dropped_frame_indices = {7, 8, 30} # Missing from the tips midpoints ring, e.g. overwritten before the hand worker read them
+    frames_ring = rings(frames_count, 1, row_shape=(1,))
+    detections_ring = rings(frames_count, 64, row_shape=(6,))
+    tips_midpoints_ring = rings(frames_count, 2, row_shape=(2,))
+    results_ring = rings(frames_count, 64, row_shape=(len(RESULT_COLUMNS),))
+
+    # CPU stand-ins of the detectors, the frames being their own frame index
+    for frame_index in range(frames_count):
+        frames_ring.write(frame_index, [[frame_index]])
+    frames_ring.close_writing()
+    _run_frame_worker(lambda frame: scene_frames[int(frame[0])][0], frames_ring, detections_ring, poll_interval=0, conf_column=1)
+    for frame_index, (_, tips_midpoints) in enumerate(scene_frames):
+        if frame_index not in dropped_frame_indices:
+            tips_midpoints_ring.write(frame_index, tips_midpoints)
+    tips_midpoints_ring.close_writing()
+
+    _run_tracker_worker(640, 480, 0.5, detections_ring, tips_midpoints_ring, results_ring, poll_interval=0)
+    assert results_ring.is_closed
+    results = read_all(results_ring)
+    assert [frame_index for frame_index, _ in results] == [frame_index for frame_index in range(frames_count) if frame_index not in dropped_frame_indices]
+
+    object_tracker = ObjectTracker(640, 480)
+    expected_results = []
+    for frame_index, (detections, tips_midpoints) in enumerate(scene_frames):
+        if frame_index not in dropped_frame_indices:
+            object_tracker.register_seen_detections(detections, tips_midpoints, 0.5)
+            expected_results.append((frame_index, get_result_rows(object_tracker)))
+        object_tracker.increment_frame_index()
+    for (frame_index, rows), (expected_frame_index, expected_rows) in zip(results, expected_results):
+        assert frame_index == expected_frame_index
+        np.testing.assert_array_equal(rows, expected_rows)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from object_tracker import ObjectTracker
+from recording import FRAME_COLUMNS, Recording, TrackerRecorder, replay
+from synthetic_scene import SyntheticScene
+
+def get_state(object_tracker):
+    store = object_tracker.store
+    return (
+        {name: getattr(store, name)[:store.size].tolist() for name in store.STATE_COLUMNS},
+        list(object_tracker.hand_tracker_ids),
+        list(object_tracker.expired_archive),
+        object_tracker.next_object_tracker_id,
+        object_tracker.frame_index,
+    )
+
+def get_frames(frames_count):
+    """Returns the (detections, tips_midpoints) frames of a scene, detections being None on every fourth frame (detector skipped)"""
+    return [(None if frame_index % 4 == 3 else detections, tips_midpoints) \
+            for frame_index, (detections, tips_midpoints) in enumerate(SyntheticScene(40, 3, 1280, 720, seed=2).iter_frames(frames_count))]
+
+def test_recording_appended_after_interruption_replays_as_direct_run(tmp_path):
+    directory = str(tmp_path)
+    frames = get_frames(240)
+    with TrackerRecorder(directory, 1280, 720) as recorder:
+        for detections, tips_midpoints in frames[:100]:
+            recorder.record(detections, tips_midpoints)
+    detections_ends = Recording(directory).frames[:, 1].tolist()
+
+    # Interruption while writing frame 98 and 99: frame 98 has all its frames row but only part of its detections,
+    # frame 99 (predict only) only part of its frames row
+    assert len(frames[98][0]) and frames[99][0] is None
+    with open(os.path.join(directory, "detections.bin"), "r+b") as detections_file:
+        detections_file.truncate(detections_ends[97]*6*8 + 20)
+    with open(os.path.join(directory, "frames.bin"), "r+b") as frames_file:
+        frames_file.truncate(99*len(FRAME_COLUMNS)*8 + 12)
+    assert len(Recording(directory)) == 98
+
+    with TrackerRecorder(directory, 1280, 720) as recorder:
+        assert (recorder.frames_count, recorder.detections_count) == (98, detections_ends[97])
+        for detections, tips_midpoints in frames[98:]:
+            recorder.record(detections, tips_midpoints)
+    recording = Recording(directory)
+    assert len(recording) == len(frames)
+    assert recording.frames[:, 0].tolist() == list(range(len(frames)))
+    assert len(recording.detections) == sum(len(detections) for detections, _ in frames if detections is not None)
+
+    object_tracker = ObjectTracker(1280, 720)
+    expected_states = []
+    for detections, tips_midpoints in frames:
+        if detections is None:
+            object_tracker.predict_only(tips_midpoints)
+        else:
+            object_tracker.register_seen_detections(detections, tips_midpoints)
+            object_tracker.increment_frame_index()
+        expected_states.append(get_state(object_tracker))
+    for chunk_frames in (None, 7):
+        states = []
+        replay(recording, chunk_frames=chunk_frames, callback=lambda replayed_object_tracker: states.append(get_state(replayed_object_tracker)))
+        assert states == expected_states
@@ -0,0 +1,63 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from object_tracker import ObjectTracker
+from snapshot import read_snapshot, write_snapshot
+from synthetic_scene import SyntheticScene
+
+def get_state(object_tracker):
+    store = object_tracker.store
+    return (
+        {name: getattr(store, name)[:store.size].tolist() for name in store.STATE_COLUMNS},
+        list(object_tracker.hand_tracker_ids),
+        list(object_tracker.expired_archive),
+        object_tracker.previous_tips_midpoints.tolist(),
+        object_tracker.next_object_tracker_id,
+        object_tracker.frame_index,
+    )
+
+def track_frame(object_tracker, frame_index, detections, tips_midpoints):
+    if ObjectTracker.MOTION_PREDICTION and frame_index % 3:
+        object_tracker.predict_only(tips_midpoints)
+    else:
+        object_tracker.register_seen_detections(detections, tips_midpoints)
+        object_tracker.increment_frame_index()
+
+def is_snapshot_frame(object_tracker, early):
+    """The early snapshot has tracked objects but no expired ones yet, the other one has a held object and expired objects"""
+    if early:
+        return len(object_tracker.store) > 0
+    return len(object_tracker.expired_archive) > 0 and any(tracker_id is not None for tracker_id in object_tracker.hand_tracker_ids)
+
+@pytest.mark.parametrize("motion_prediction", (False, True))
+@pytest.mark.parametrize("early", (True, False))
+def test_restored_tracker_keeps_tracking_as_original(monkeypatch, motion_prediction, early):
+    monkeypatch.setattr(ObjectTracker, "MOTION_PREDICTION", motion_prediction)
+    frames = SyntheticScene(60, 3, 1280, 720, seed=1).iter_frames(400)
+    object_tracker = ObjectTracker(1280, 720)
+    for frame_index, (detections, tips_midpoints) in enumerate(frames):
+        track_frame(object_tracker, frame_index, detections, tips_midpoints)
+        if is_snapshot_frame(object_tracker, early):
+            break
+    else:
+        pytest.fail("The scene never reaches the snapshot frame")
+    assert len(object_tracker.expired_archive) == 0 if early else len(object_tracker.expired_archive) > 0
+
+    file = io.BytesIO()
+    write_snapshot(object_tracker.get_state(), file)
+    file.seek(0)
+    restored_object_tracker = ObjectTracker.from_state(read_snapshot(file))
+    assert get_state(restored_object_tracker) == get_state(object_tracker)
+
+    for frame_index, (detections, tips_midpoints) in enumerate(frames, frame_index + 1):
+        track_frame(object_tracker, frame_index, detections, tips_midpoints)
+        track_frame(restored_object_tracker, frame_index, detections, tips_midpoints)
+        assert get_state(restored_object_tracker) == get_state(object_tracker)
+    assert frame_index == 399
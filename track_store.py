@@ -0,0 +1,179 @@
+import numpy as np
+
+from spatial_grid import SpatialGrid
+from tracked_object import TrackedObject
+
+def get_centers(bboxes):
+    """Returns the (x, y) centers of an array of (x1, y1, x2, y2) boxes, rounded down as in YoloObject.get_center"""
+    return np.floor_divide(bboxes[..., 0:2] + bboxes[..., 2:4], 2)
+
+class TrackStore:
+    """Struct-of-arrays storage of the tracked objects, one row per object.
+    Rows are kept in insertion order and removed by masked compaction.
+    If cell_size is given, the centers are indexed by a SpatialGrid kept up to date with the boxes"""
+    COLUMNS = (
+        ("tracker_id", np.int64, ()),
+        ("label_id", np.int64, ()),
+        ("conf", np.float64, ()),
+        ("bbox", np.float64, (4,)),
+        ("center", np.float64, (2,)),
+        ("last_seen_frame_index", np.int64, ()),
+        ("frames_persistence", np.int64, ()),
+        ("in_hand_frames_persistence", np.int64, ()),
+        ("is_visible", np.bool_, ()),
+        ("is_moving", np.bool_, ()),
+        ("last_revival_frame_index", np.int64, ()),
+        ("velocity", np.float64, (2,)),
+        ("motion_frames", np.int64, ()),
+        ("cell_key", np.int64, ()),
+    )
+    VALUE_COLUMNS = tuple(name for name, _, _ in COLUMNS if name not in ("tracker_id", "cell_key"))
+    # Columns saved in a snapshot, the cell keys being recomputed on restore
+    STATE_COLUMNS = tuple(name for name, _, _ in COLUMNS if name != "cell_key")
+
+    def __init__(self, capacity=64, cell_size=None):
+        self.size = 0
+        self.capacity = capacity
+        self.row_of = {}
+        self.views = {}
+        self.grid = SpatialGrid(cell_size) if cell_size else None
+        for name, dtype, shape in TrackStore.COLUMNS:
+            setattr(self, name, np.empty((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, tracker_id):
+        return tracker_id in self.row_of
+
+    def append(self, tracker_ids, label_ids, confs, bboxes, frame_index):
+        """Appends new objects seen at frame_index and returns their rows"""
+        count = len(tracker_ids)
+        self._reserve(self.size + count)
+        rows = np.arange(self.size, self.size + count)
+        self.tracker_id[rows] = tracker_ids
+        self.label_id[rows] = label_ids
+        self.cell_key[rows] = -1
+        self.set_boxes(rows, confs, bboxes)
+        self.last_seen_frame_index[rows] = frame_index
+        self.frames_persistence[rows] = 1
+        self.in_hand_frames_persistence[rows] = 0
+        self.is_visible[rows] = True
+        self.is_moving[rows] = False
+        self.last_revival_frame_index[rows] = -1
+        self.velocity[rows] = 0
+        self.motion_frames[rows] = 0
+        for row, tracker_id in zip(rows.tolist(), self.tracker_id[rows].tolist()):
+            self.row_of[tracker_id] = row
+        self.size += count
+        return rows
+
+    def append_values(self, tracker_id, values):
+        """Appends a single object from a dict with the values of its columns and returns its row"""
+        row = self.append((tracker_id,), (values["label_id"],), (values["conf"],), (values["bbox"],), values["last_seen_frame_index"])[0]
+        for name in ("frames_persistence", "in_hand_frames_persistence", "is_visible", "is_moving", "last_revival_frame_index"):
+            if name in values:
+                getattr(self, name)[row] = values[name]
+        return row
+
+    def set_boxes(self, rows, confs, bboxes):
+        self.conf[rows] = confs
+        self.bbox[rows] = bboxes
+        self.center[rows] = get_centers(self.bbox[rows])
+        self._update_cells(rows)
+
+    def move_boxes(self, rows, offsets):
+        """Translates the boxes of the rows by (dx, dy) offsets"""
+        self.bbox[rows] += np.tile(offsets, 2)
+        self.center[rows] = get_centers(self.bbox[rows])
+        self._update_cells(rows)
+
+    def remove(self, remove_mask):
+        """Removes the rows selected by remove_mask (of length size), keeping the order of the others.
+        Returns a dict with the column values of the removed rows"""
+        removed_rows = np.flatnonzero(remove_mask)
+        removed = {name: getattr(self, name)[removed_rows] for name, _, _ in TrackStore.COLUMNS}
+        if not len(removed_rows):
+            return removed
+
+        for row, tracker_id in zip(removed_rows.tolist(), removed["tracker_id"].tolist()):
+            del self.row_of[tracker_id]
+            view = self.views.pop(tracker_id, None)
+            if view is not None:
+                view._detach(self.get_values(row))
+
+        kept_rows = np.flatnonzero(~remove_mask)
+        count = len(kept_rows)
+        for name, _, _ in TrackStore.COLUMNS:
+            column = getattr(self, name)
+            column[:count] = column[kept_rows]
+        for row, tracker_id in enumerate(self.tracker_id[removed_rows[0]:count].tolist(), removed_rows[0]):
+            self.row_of[tracker_id] = row
+        if self.grid is not None:
+            new_rows = np.full(self.size, -1)
+            new_rows[kept_rows] = np.arange(count)
+            self.grid.renumber(new_rows)
+        self.size = count
+        return removed
+
+    def attach(self, tracked_object):
+        """Makes a detached TrackedObject the view of its stored row again"""
+        tracked_object._attach(self)
+        self.views[tracked_object.tracker_id] = tracked_object
+
+    def restore(self, columns):
+        """Replaces the objects of the store with the ones in columns, a dict with an array per STATE_COLUMNS name, and rebuilds the grid"""
+        for view in self.views.values():
+            view._detach(self.get_values(self.row_of[view.tracker_id]))
+        self.views = {}
+        count = len(columns["tracker_id"])
+        self.size = 0
+        self._reserve(count)
+        for name in TrackStore.STATE_COLUMNS:
+            getattr(self, name)[:count] = columns[name]
+        self.size = count
+        self.row_of = dict(zip(self.tracker_id[:count].tolist(), range(count)))
+        if self.grid is not None:
+            self.cell_key[:count] = self.grid.get_cell_keys(self.center[:count])
+            self.grid.rebuild(self.cell_key[:count])
+
+    def get_values(self, row):
+        """Returns the values of a row as a dict of python objects"""
+        values = {name: getattr(self, name)[row].tolist() for name in TrackStore.VALUE_COLUMNS}
+        values["bbox"] = tuple(values["bbox"])
+        values["center"] = tuple(values["center"])
+        values["velocity"] = tuple(values["velocity"])
+        return values
+
+    def get_value(self, tracker_id, name):
+        return getattr(self, name)[self.row_of[tracker_id]].tolist()
+
+    def set_value(self, tracker_id, name, value):
+        getattr(self, name)[self.row_of[tracker_id]] = value
+
+    def view(self, tracker_id):
+        """Returns the TrackedObject view of the object with the specified tracker id, None if not stored"""
+        if tracker_id not in self.row_of:
+            return None
+        view = self.views.get(tracker_id)
+        if view is None:
+            view = TrackedObject.from_store(self, tracker_id)
+            self.views[tracker_id] = view
+        return view
+
+    def _update_cells(self, rows):
+        if self.grid is not None:
+            rows = np.atleast_1d(rows)
+            cell_keys = self.grid.get_cell_keys(self.center[rows])
+            self.grid.move(rows, self.cell_key[rows], cell_keys)
+            self.cell_key[rows] = cell_keys
+
+    def _reserve(self, size):
+        if size <= self.capacity:
+            return
+        capacity = max(size, 2*self.capacity)
+        for name, dtype, shape in TrackStore.COLUMNS:
+            column = np.empty((capacity,) + shape, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.capacity = capacity
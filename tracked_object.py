@@ -1,12 +1,120 @@
+from yolo_object import YoloObject
+
 class TrackedObject:
+    """Lightweight view of a tracked object stored in a TrackStore.
+    When its row is removed from the store (e.g. expiration) the view keeps a detached copy of the values"""
+    __slots__ = ("tracker_id", "_store", "_values", "__weakref__")
+
     def __init__(self, yolo_object, tracker_id, frame_index):
-        self.yolo_object = yolo_object
         self.tracker_id = tracker_id
-        self.last_seen_frame_index = frame_index
-        self.frames_persistence = 1
-        self.in_hand_frames_persistence = 0
-        self.is_visible = True
-        self.is_moving = False
+        self._store = None
+        self._values = {
+            "last_seen_frame_index": frame_index,
+            "frames_persistence": 1,
+            "in_hand_frames_persistence": 0,
+            "is_visible": True,
+            "is_moving": False,
+            "velocity": (0.0, 0.0),
+        }
+        self.yolo_object = yolo_object
+
+    @classmethod
+    def from_store(cls, store, tracker_id):
+        tracked_object = cls.__new__(cls)
+        tracked_object.tracker_id = tracker_id
+        tracked_object._store = store
+        tracked_object._values = None
+        return tracked_object
+
+    @classmethod
+    def from_values(cls, tracker_id, values):
+        tracked_object = cls.__new__(cls)
+        tracked_object.tracker_id = tracker_id
+        tracked_object._store = None
+        tracked_object._values = dict(values)
+        return tracked_object
+
+    @property
+    def yolo_object(self):
+        x1, y1, x2, y2 = map(int, self._get("bbox"))
+        return YoloObject(self._get("label_id"), self._get("conf"), x1, y1, x2, y2)
+
+    @yolo_object.setter
+    def yolo_object(self, yolo_object):
+        bbox = (yolo_object.x1, yolo_object.y1, yolo_object.x2, yolo_object.y2)
+        if self._store is None:
+            self._values["label_id"] = yolo_object.label_id
+            self._values["conf"] = yolo_object.conf
+            self._values["bbox"] = bbox
+            self._values["center"] = yolo_object.get_center()
+        else:
+            row = self._store.row_of[self.tracker_id]
+            self._store.label_id[row] = yolo_object.label_id
+            self._store.set_boxes(row, yolo_object.conf, bbox)
+
+    @property
+    def last_seen_frame_index(self):
+        return self._get("last_seen_frame_index")
+
+    @last_seen_frame_index.setter
+    def last_seen_frame_index(self, value):
+        self._set("last_seen_frame_index", value)
+
+    @property
+    def frames_persistence(self):
+        return self._get("frames_persistence")
+
+    @frames_persistence.setter
+    def frames_persistence(self, value):
+        self._set("frames_persistence", value)
+
+    @property
+    def in_hand_frames_persistence(self):
+        return self._get("in_hand_frames_persistence")
+
+    @in_hand_frames_persistence.setter
+    def in_hand_frames_persistence(self, value):
+        self._set("in_hand_frames_persistence", value)
+
+    @property
+    def is_visible(self):
+        return self._get("is_visible")
+
+    @is_visible.setter
+    def is_visible(self, value):
+        self._set("is_visible", value)
+
+    @property
+    def is_moving(self):
+        return self._get("is_moving")
+
+    @is_moving.setter
+    def is_moving(self, value):
+        self._set("is_moving", value)
+
+    @property
+    def velocity(self):
+        """(dx, dy) estimated motion per frame, in pixels"""
+        return tuple(self._get("velocity"))
+
+    def _get(self, name):
+        if self._store is None:
+            return self._values[name]
+        return self._store.get_value(self.tracker_id, name)
+
+    def _set(self, name, value):
+        if self._store is None:
+            self._values[name] = value
+        else:
+            self._store.set_value(self.tracker_id, name, value)
+
+    def _detach(self, values):
+        self._store = None
+        self._values = values
+
+    def _attach(self, store):
+        self._store = store
+        self._values = None
 
     def __repr__(self):
         return f"TrackedObject(yolo_object.label_id={self.yolo_object.label_id}, tracker_id={self.tracker_id}, " \
@@ -0,0 +1,40 @@
+import numpy as np
+
+EVENT_TYPES = ("created", "confirmed", "hidden", "visible", "back_to_track", "picked_up", "stably_held", "released", "expired",
+               "false_seen_dropped", "forced_in_hand", "revived")
+(CREATED, CONFIRMED, HIDDEN, VISIBLE, BACK_TO_TRACK, PICKED_UP, STABLY_HELD, RELEASED, EXPIRED,
+ FALSE_SEEN_DROPPED, FORCED_IN_HAND, REVIVED) = range(len(EVENT_TYPES))
+
+# One row per event, hand_index being -1 for the events not related to a hand and bbox the box of the object at the event
+EVENT_DTYPE = np.dtype([
+    ("frame_index", "<i8"),
+    ("event_type", "u1"),
+    ("hand_index", "i1"),
+    ("tracker_id", "<i8"),
+    ("label_id", "<i4"),
+    ("bbox", "<f4", (4,)),
+])
+
+def make_events(frame_index, event_type, tracker_ids, label_ids, bboxes, hand_index=-1):
+    """Returns an EVENT_DTYPE array with one event of event_type per object"""
+    events = np.empty(len(tracker_ids), dtype=EVENT_DTYPE)
+    events["frame_index"] = frame_index
+    events["event_type"] = event_type
+    events["hand_index"] = hand_index
+    events["tracker_id"] = tracker_ids
+    events["label_id"] = label_ids
+    events["bbox"] = bboxes
+    return events
+
+def get_event_dicts(events):
+    """Returns the events of an EVENT_DTYPE array as dicts, with the event type name, e.g. to be serialized as JSON"""
+    return [{
+        "frame_index": frame_index,
+        "event_type": EVENT_TYPES[event_type],
+        "hand_index": hand_index,
+        "tracker_id": tracker_id,
+        "label_id": label_id,
+        "bbox": bbox,
+    } for frame_index, event_type, hand_index, tracker_id, label_id, bbox in zip(
+        events["frame_index"].tolist(), events["event_type"].tolist(), events["hand_index"].tolist(),
+        events["tracker_id"].tolist(), events["label_id"].tolist(), events["bbox"].tolist())]
@@ -1,5 +1,13 @@
 import numpy as np
 
+def split_detections(detections, conf_threshold=0):
+    """Splits a (N, 6) array of (label_id, conf, x1, y1, x2, y2) rows into labels, confidences and boxes,
+    keeping only the detections with confidence above conf_threshold. Box coordinates are truncated to integers as in YoloObject"""
+    detections = np.asarray(detections).reshape(-1, 6)
+    if conf_threshold:
+        detections = detections[detections[:, 1] > conf_threshold]
+    return detections[:, 0].astype(np.int64), detections[:, 1].astype(np.float64), np.trunc(detections[:, 2:6], dtype=np.float64)
+
 class YoloObject:
 
     def __init__(self, label_id, conf, x1, y1, x2, y2):
@@ -19,12 +27,15 @@ class YoloObject:
     
     @classmethod
     def from_np_array(cls, np_array):
-        label_id, x1, y1, x2, y2 = map(int, np_array[0:5])
-        conf = np_array[5]
+        """np_array: (label_id, conf, x1, y1, x2, y2), the format returned by get_np_array"""
+        label_id = int(np_array[0])
+        conf = float(np_array[1])
+        x1, y1, x2, y2 = map(int, np_array[2:6])
         return cls(label_id, conf, x1, y1, x2, y2)
     
     def get_np_array(self):
-        return np.array((self.label_id, self.conf, self.x1, self.x2, self.y1, self.y2))
+        """Returns (label_id, conf, x1, y1, x2, y2), the row format of ObjectTracker.register_seen_detections"""
+        return np.array((self.label_id, self.conf, self.x1, self.y1, self.x2, self.y2), dtype=np.float64)
     
     def get_center(self):
         return ((self.x1 + self.x2)//2, (self.y1 + self.y2)//2)